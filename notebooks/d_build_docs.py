@@ -5,8 +5,13 @@ app = marimo.App(app_title="MD.d_build_docs.py")
 
 with app.setup:
     from pathlib import Path
+    import filecmp, gzip, json, os
+
+    MANIFEST = '.marimo-dev/docs.json'   # docs outputs per writer, for pruning ones no longer produced
+    COMPRESSED = ('.gz', '.zst')         # every precompressed sibling suffix compress_docs may write
 
     from a_types import Project
+    from l_profiling import span
 
 
 
@@ -17,13 +22,32 @@ def _(mo):
 
     Consumes a Project and writes documentation files.
     Each render function is Project -> str. Pure traversal.
+    Big outputs also come as iter_* generators that yield one module or
+    export at a time, and write_stream writes those straight to disk, so
+    peak memory is one export's source rather than the whole project's.
 
     Public API:
     ```
         build_docs(project) -> str
         render_llms(project) -> str
         render_llms_full(project) -> str
+        iter_llms_full(project) -> Iterator[str]
+        write_stream(path, chunks) -> bool
+        compress_docs(paths) -> str
+        drop_compressed(paths) -> list[str]
+        prune_docs(root, key, outputs) -> list[str]
     ```
+
+    With `compress = true` every docs file also gets `.gz` (and `.zst` on
+    Python 3.14+) siblings at maximum level, for static hosts that serve
+    precompressed files. A sibling carries its source's mtime and is
+    rewritten whenever the two differ; write_stream keeps the source's mtime
+    when nothing changed. With `compress = false` the siblings are deleted,
+    so a host never serves a stale one.
+
+    Writers record what they produced in `.marimo-dev/docs.json`;
+    `prune_docs` deletes last run's outputs that this run did not produce,
+    e.g. the split page (and its siblings) of a renamed or removed module.
     """)
     return
 
@@ -52,18 +76,27 @@ def render_llms(
 
 
 @app.function
-def render_llms_full(
+def iter_llms_full(
     proj: Project, # complete parsed project
-) -> str:          # llms-full.txt content
-    "Render llms-full.txt — complete cleaned source."
-    parts = [f"# {proj.meta.name}\n\n> {proj.meta.desc}\n"]
+):                 # yields llms-full.txt in chunks, one per heading or export
+    "Stream llms-full.txt — complete cleaned source — without building it in memory."
+    yield f"# {proj.meta.name}\n\n> {proj.meta.desc}\n"
     for mod in proj.nonempty_modules:
         documented = mod.documented_exports
         if not documented: continue
-        parts.append(f"## {mod.name}\n")
+        yield f"\n\n## {mod.name}\n"
         for exp in documented:
-            parts.append(exp.clean_src)
-    return '\n\n'.join(parts) + '\n'
+            yield "\n\n"
+            if exp.source: yield from exp.source.chunks()  # slices of the notebook buffer, never joined
+    yield '\n'
+
+
+@app.function
+def render_llms_full(
+    proj: Project, # complete parsed project
+) -> str:          # llms-full.txt content
+    "Render llms-full.txt — complete cleaned source."
+    return ''.join(iter_llms_full(proj))
 
 
 @app.cell(hide_code=True)
@@ -74,6 +107,109 @@ def _(mo):
     return
 
 
+@app.function
+def write_stream(
+    path: Path,   # file to write
+    chunks,       # iterable of str, written as they come
+) -> bool:        # True if the file was created or rewritten
+    """Write chunks to a temp file next to path, then swap it in only if the bytes differ.
+
+    Unchanged files keep their mtime, and a failing generator never leaves a
+    half-written file behind.
+    """
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for chunk in chunks: f.write(chunk)
+        if path.exists() and filecmp.cmp(tmp, path, shallow=False):
+            tmp.unlink()
+            return False
+        os.replace(tmp, path)
+        return True
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+@app.function
+def internal_codecs(
+) -> list[tuple]: # (suffix, compress function) per available format
+    "gzip at level 9 with a fixed mtime (reproducible bytes), plus zstd at its maximum level where the stdlib has it."
+    codecs = [('.gz', lambda b: gzip.compress(b, compresslevel=9, mtime=0))]
+    try:
+        from compression import zstd
+        top = zstd.CompressionParameter.compression_level.bounds()[1]
+        codecs.append(('.zst', lambda b: zstd.compress(b, level=top)))
+    except ImportError:
+        pass
+    return codecs
+
+
+@app.function
+def compress_docs(
+    paths: list[Path], # docs files already written
+) -> str:              # size report, one line per file
+    """Write precompressed siblings of each file whose mtime they do not carry, and report sizes.
+
+    Siblings in formats this Python cannot write are deleted rather than left stale.
+    """
+    codecs, lines = internal_codecs(), []
+    drop_compressed(paths, keep=tuple(ext for ext, _ in codecs))
+    for path in paths:
+        st, data, sizes = path.stat(), None, []
+        for ext, fn in codecs:
+            out = path.with_name(path.name + ext)
+            if not out.exists() or out.stat().st_mtime_ns != st.st_mtime_ns:
+                if data is None: data = path.read_bytes()
+                tmp = out.with_name(f'.{out.name}.{os.getpid()}.tmp')
+                tmp.write_bytes(fn(data))
+                os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+                os.replace(tmp, out)
+            n = out.stat().st_size
+            sizes.append(f"{ext[1:]} {n:>9,} ({n / max(st.st_size, 1):.0%})")
+        lines.append(f"  {path.name:<22}{st.st_size:>10,}  →  " + '  '.join(sizes))
+    return '\n'.join(lines)
+
+
+@app.function
+def drop_compressed(
+    paths: list[Path],      # docs files
+    keep: tuple = (),       # sibling suffixes to leave alone
+) -> list[str]:             # names of the siblings deleted
+    "Delete the precompressed siblings of docs files."
+    removed = []
+    for path in paths:
+        for ext in COMPRESSED:
+            out = Path(path).with_name(Path(path).name + ext)
+            if ext not in keep and out.exists():
+                out.unlink()
+                removed.append(out.name)
+    return removed
+
+
+@app.function
+def prune_docs(
+    root: str,             # project root holding the manifest
+    key: str,              # writer whose outputs these are, e.g. 'html'
+    outputs: list[Path],   # every file this run produced, compressed siblings included
+) -> list[str]:            # names of the files deleted
+    "Delete what the writer produced last time but not this time, then record this run's outputs."
+    path = Path(root) / MANIFEST
+    try: manifest = json.loads(path.read_text())
+    except (OSError, ValueError): manifest = {}
+    now = sorted({str(p) for p in outputs})
+    removed = []
+    for f in manifest.get(key, ()):
+        if f not in now and os.path.exists(f):
+            os.unlink(f)
+            removed.append(Path(f).name)
+    if manifest.get(key) != now:
+        manifest[key] = now
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(manifest, indent=1))
+    return removed
+
+
 @app.function
 def build_docs(
     proj: Project, # complete parsed project
@@ -82,9 +218,14 @@ def build_docs(
     docs = Path(proj.config.root) / proj.config.docs
     docs.mkdir(parents=True, exist_ok=True)
  
-    (docs / 'llms.txt').write_text(render_llms(proj))
-    (docs / 'llms-full.txt').write_text(render_llms_full(proj))
- 
+    with span('llms.txt'): write_stream(docs / 'llms.txt', [render_llms(proj)])
+    with span('llms-full.txt'): write_stream(docs / 'llms-full.txt', iter_llms_full(proj))
+
+    paths = [docs / 'llms.txt', docs / 'llms-full.txt']
+    if proj.config.compress:
+        with span('compress'):
+            return f"Wrote docs to {docs}\n" + compress_docs(paths)
+    drop_compressed(paths)
     return f"Wrote docs to {docs}"
 
 
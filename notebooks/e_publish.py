@@ -8,17 +8,21 @@ with app.setup:
     marimo-dev publish.
 
     Build distribution and upload to PyPI.
-    Reads credentials from ~/.pypirc, calls uv build + uv publish.
+    The wheel and sdist are written straight from the in-memory Project
+    (no build backend, no subprocess); uploading uses ~/.pypirc + uv publish.
 
     Public API:
+        dist(project, out) -> list[str]
+        build_wheel(project, out) -> str
+        build_sdist(project, out) -> str
         publish(project, test) -> None
     """
 
     from pathlib import Path
-    import configparser, shutil, subprocess
+    import base64, configparser, gzip, hashlib, io, os, re, shutil, subprocess, tarfile, time, zipfile
 
     from a_types import Project
-    from c_build_pkg import build
+    from c_build_pkg import build, render_package
 
     PYPI_URLS = {
         'testpypi': 'https://test.pypi.org/legacy/',
@@ -63,6 +67,154 @@ def internal_read_pypirc(
     return (username, password)
 
 
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Distributions
+
+    Wheel (PEP 427) and sdist (PEP 625) from the rendered modules and `Meta`.
+    Every archive member gets the same timestamp (`SOURCE_DATE_EPOCH`, or
+    1980-01-01), owner and mode, in sorted order, so the same project always
+    produces the same bytes.
+    """)
+    return
+
+
+@app.function
+def internal_epoch(
+) -> int: # archive timestamp in seconds
+    "SOURCE_DATE_EPOCH if set, else 1980-01-01, the earliest time a zip can hold."
+    return max(int(os.environ.get('SOURCE_DATE_EPOCH', 0)), 315532800)
+
+
+@app.function
+def internal_dist_name(
+    name: str, # project name, e.g. 'marimo-dev'
+) -> str:      # normalized file name part, e.g. 'marimo_dev'
+    "Distribution name as used in wheel and sdist file names."
+    return re.sub(r'[-_.]+', '_', name).lower()
+
+
+@app.function
+def render_metadata(
+    proj: Project,  # complete parsed project
+    root: str = '', # project root for the readme, defaults to proj.config.root
+) -> str:           # METADATA / PKG-INFO text (core metadata 2.1)
+    "Core metadata from Meta, with the readme as the long description."
+    meta = proj.meta
+    lines = ['Metadata-Version: 2.1', f'Name: {meta.name}', f'Version: {meta.version}']
+    if meta.desc:    lines.append(f'Summary: {meta.desc}')
+    if meta.author:  lines.append(f"{'Author-email' if '<' in meta.author else 'Author'}: {meta.author}")
+    if meta.license: lines.append(f'License: {meta.license}')
+    if meta.keywords: lines.append(f"Keywords: {','.join(meta.keywords)}")
+    lines += [f'Classifier: {c}' for c in meta.classifiers]
+    lines += [f'Project-URL: {k}, {v}' for k, v in meta.urls.items()]
+    if meta.requires_python: lines.append(f'Requires-Python: {meta.requires_python}')
+    lines += [f'Requires-Dist: {d}' for d in meta.dependencies]
+    for extra, reqs in meta.extras.items():
+        lines.append(f'Provides-Extra: {extra}')
+        for r in reqs:
+            req, _, marker = r.partition(';')
+            marker = f'({marker.strip()}) and extra == "{extra}"' if marker.strip() else f'extra == "{extra}"'
+            lines.append(f'Requires-Dist: {req.strip()}; {marker}')
+    body = ''
+    if meta.readme:
+        readme = Path(root or proj.config.root) / meta.readme
+        kind = {'.md': 'text/markdown', '.rst': 'text/x-rst'}.get(readme.suffix.lower(), 'text/plain')
+        lines.append(f'Description-Content-Type: {kind}')
+        body = '\n' + readme.read_text()
+    return '\n'.join(lines) + '\n' + body
+
+
+@app.function
+def internal_record_line(
+    path: str,   # archive path
+    data: bytes, # file contents
+) -> str:        # RECORD row: path,sha256=<urlsafe b64, no padding>,size
+    "One RECORD entry (PEP 376 / wheel spec)."
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+    return f'{path},sha256={digest},{len(data)}'
+
+
+@app.function
+def wheel_files(
+    proj: Project, # complete parsed project
+) -> dict[str, bytes]: # archive path → contents, in archive order, RECORD last
+    "Everything that goes into the py3-none-any wheel."
+    meta, pkg = proj.meta, proj.meta.pkg_name
+    info = f'{internal_dist_name(meta.name)}-{meta.version}.dist-info'
+    files = {f'{pkg}/{n}': text.encode() for n, text in sorted(render_package(proj).items())}
+    files[f'{info}/METADATA'] = render_metadata(proj).encode()
+    files[f'{info}/WHEEL'] = ('Wheel-Version: 1.0\nGenerator: marimo-dev\n'
+                              'Root-Is-Purelib: true\nTag: py3-none-any\n').encode()
+    if meta.scripts:
+        files[f'{info}/entry_points.txt'] = ('[console_scripts]\n' + ''.join(
+            f'{k} = {v}\n' for k, v in meta.scripts.items())).encode()
+    record = [internal_record_line(p, d) for p, d in files.items()] + [f'{info}/RECORD,,']
+    files[f'{info}/RECORD'] = ('\n'.join(record) + '\n').encode()
+    return files
+
+
+@app.function
+def build_wheel(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> str:              # path to the .whl
+    "Write {name}-{version}-py3-none-any.whl, byte-for-byte reproducible."
+    meta = proj.meta
+    path = Path(proj.config.root) / out / f'{internal_dist_name(meta.name)}-{meta.version}-py3-none-any.whl'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stamp = time.gmtime(internal_epoch())[:6]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in wheel_files(proj).items():
+            info = zipfile.ZipInfo(name, date_time=stamp)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            z.writestr(info, data)
+    return str(path)
+
+
+@app.function
+def build_sdist(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> str:              # path to the .tar.gz
+    """Write {name}-{version}.tar.gz: PKG-INFO, pyproject.toml, readme, LICENSE*
+    and the rendered package under the out directory, buildable by the
+    project's own build backend.
+    """
+    cfg, meta = proj.config, proj.meta
+    root, base = Path(cfg.root), f'{internal_dist_name(meta.name)}-{meta.version}'
+    files = {'PKG-INFO': render_metadata(proj).encode(),
+             'pyproject.toml': (root / 'pyproject.toml').read_bytes()}
+    for extra in [meta.readme] + sorted(p.name for p in root.glob('LICEN[CS]E*')):
+        if extra and (root / extra).is_file(): files[extra] = (root / extra).read_bytes()
+    for n, text in render_package(proj).items():
+        files[f'{cfg.out}/{meta.pkg_name}/{n}'] = text.encode()
+
+    path = root / out / f'{base}.tar.gz'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    epoch = internal_epoch()
+    with open(path, 'wb') as fh, gzip.GzipFile(fileobj=fh, mode='wb', mtime=epoch, filename='') as gz, \
+         tarfile.open(fileobj=gz, mode='w', format=tarfile.PAX_FORMAT) as tar:
+        for name in sorted(files):
+            info = tarfile.TarInfo(f'{base}/{name}')
+            info.size, info.mtime, info.mode = len(files[name]), epoch, 0o644
+            tar.addfile(info, io.BytesIO(files[name]))
+    return str(path)
+
+
+@app.function
+def dist(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> list[str]:        # paths of the sdist and the wheel
+    "Build the sdist and wheel in-process and report their sizes."
+    paths = [build_sdist(proj, out), build_wheel(proj, out)]
+    for p in paths: print(f"Wrote {p} ({Path(p).stat().st_size:,} bytes)")
+    return paths
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(r"""
@@ -90,9 +242,9 @@ def publish(
     print("Building package from notebooks...")
     build(proj)
 
-    shutil.rmtree('dist', ignore_errors=True)
+    shutil.rmtree(Path(proj.config.root) / 'dist', ignore_errors=True)
     print("Building distribution...")
-    subprocess.run(['uv', 'build'], check=True)
+    dist(proj)
 
     print(f"Publishing to {target}...")
     try:
@@ -110,6 +262,58 @@ def publish(
             print(f"Publish failed: {e.stderr}")
 
 
+@app.function
+def test_dist_offline():
+    "Wheel and sdist: RECORD matches the archive, builds are byte-identical, pip installs the wheel offline."
+    import csv, sys, tempfile
+    from contextlib import chdir
+    from b_parse import read_project
+    nb = ('import marimo\napp = marimo.App()\n\n@app.function\ndef greet(\n    name: str, # who\n'
+          ') -> str: # greeting\n    "Say hello."\n    return f"hello {name}"\n')
+    with tempfile.TemporaryDirectory() as d:
+        root = Path(d)
+        (root / 'notebooks').mkdir()
+        (root / 'notebooks' / 'a_greet.py').write_text(nb)
+        (root / 'README.md').write_text('# demo\n')
+        (root / 'pyproject.toml').write_text(
+            '[project]\nname = "md-demo"\nversion = "0.1.0"\ndescription = "demo"\nreadme = "README.md"\n'
+            '[project.scripts]\nmd-demo = "md_demo.greet:greet"\n')
+        old = os.environ.get('SOURCE_DATE_EPOCH')
+        os.environ['SOURCE_DATE_EPOCH'] = '1700000000'
+        try:
+            with chdir(d):
+                proj = read_project(cache=False)
+                builds = [[Path(p).read_bytes() for p in (build_sdist(proj, o), build_wheel(proj, o))]
+                          for o in ('dist1', 'dist2')]
+        finally:
+            if old is None: os.environ.pop('SOURCE_DATE_EPOCH')
+            else: os.environ['SOURCE_DATE_EPOCH'] = old
+        assert builds[0] == builds[1], "two builds with the same SOURCE_DATE_EPOCH differ"
+
+        whl = root / 'dist1' / 'md_demo-0.1.0-py3-none-any.whl'
+        with zipfile.ZipFile(whl) as z:
+            names = z.namelist()
+            rows = list(csv.reader(io.StringIO(z.read('md_demo-0.1.0.dist-info/RECORD').decode())))
+            assert sorted(r[0] for r in rows) == sorted(names), "RECORD does not list exactly the archive members"
+            for path, digest, size in rows:
+                if path.endswith('/RECORD'): assert digest == size == '', path; continue
+                assert f'{path},{digest},{size}' == internal_record_line(path, z.read(path)), path
+            assert all(i.date_time == time.gmtime(1700000000)[:6] for i in z.infolist())
+
+        with tarfile.open(root / 'dist1' / 'md_demo-0.1.0.tar.gz') as tar:
+            members = {m.name: m for m in tar.getmembers()}
+            assert 'md_demo-0.1.0/PKG-INFO' in members, sorted(members)
+            assert 'md_demo-0.1.0/src/md_demo/greet.py' in members, sorted(members)
+            assert all(m.mtime == 1700000000 for m in members.values())
+
+        site = root / 'site'
+        subprocess.run([sys.executable, '-m', 'pip', 'install', '--no-index', '--quiet', '--target', str(site), str(whl)],
+                       check=True, capture_output=True, text=True)
+        r = subprocess.run([sys.executable, '-c', 'from md_demo.greet import greet; print(greet("x"))'],
+                           env={**os.environ, 'PYTHONPATH': str(site)}, capture_output=True, text=True, check=True)
+        assert r.stdout == 'hello x\n', r.stdout
+
+
 @app.cell
 def _():
     import marimo as mo
@@ -4,14 +4,15 @@ __generated_with = "0.23.1"
 app = marimo.App(width="medium", app_title="MD.e_cli")
 
 with app.setup:
-    import sys, shutil
-    from pathlib import Path
+    # Only what every command needs: each command imports its own modules, so
+    # `md tidy` never loads html_tags and `md build` never loads publish.
+    import os, sys
 
-    from b_parse import read_project
-    from c_build_pkg import build, bundle
-    from d_build_docs import build_docs
-    from e_publish import publish
-    from g_build_docs_html import build_docs_html
+    USAGE = "Usage: md [build|docs|bundle|dist|publish|watch|serve|importtime|bench|tidy|nuke] [--no-cache] [-j N] [--profile[=cprofile]] [--dry-run]"
+    VALUE_FLAGS = ('-j',)
+    TIDY_DIRS = ('__pycache__', '__marimo__', '.pytest_cache')  # removed wherever they are
+    TIDY_SUFFIXES = ('.pyc',)                                   # stray bytecode outside __pycache__
+    SERVED = ('build', 'docs', 'bundle', 'dist')                # commands a running md serve answers
 
 
 @app.cell(hide_code=True)
@@ -22,61 +23,299 @@ def _(mo):
     Thin dispatch. read_project() once, pass to the right builder.
 
     ```
-        Usage: md [build|docs|bundle|publish|tidy|nuke]
+        Usage: md [build|docs|bundle|dist|publish|watch|serve|importtime|bench|tidy|nuke] [--no-cache] [-j N] [--profile[=cprofile]] [--dry-run]
     ```
     """)
     return
 
 
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Cleaning
+
+    `tidy` is one `os.scandir` walk. It never enters `.git`, a virtualenv
+    (any directory holding `pyvenv.cfg`) or a directory that a `.gitignore`
+    on the way down ignores, except the cache directories it is there to
+    remove. Matches are sized and deleted on a thread pool.
+    """)
+    return
+
+
 @app.function
-def tidy():
+def internal_ignore_rules(
+    d: str,       # directory that may hold a .gitignore
+    rel: str,     # d relative to the walk root, '' for the root
+) -> list[tuple]: # (base, pattern, anchored, negate) per rule, in file order
+    "Parse a .gitignore into rules matched against directory paths."
+    try:
+        with open(os.path.join(d, '.gitignore')) as f: lines = f.read().splitlines()
+    except OSError: return []
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        negate = line.startswith('!')
+        pat = line.lstrip('!').rstrip('/')
+        anchored = '/' in pat
+        rules.append((rel, pat.lstrip('/'), anchored, negate))
+    return rules
+
+
+@app.function
+def internal_ignored(
+    rel: str,     # directory path relative to the walk root, '/'-separated
+    rules: list,  # accumulated _ignore_rules, outermost first
+) -> bool:        # the last matching rule ignores it
+    "gitignore matching for a directory: basename patterns anywhere, slashed patterns from their file."
+    from fnmatch import fnmatch
+    ignored, name = False, rel.rpartition('/')[2]
+    for base, pat, anchored, negate in rules:
+        if base and not rel.startswith(base + '/'): continue
+        if fnmatch(rel[len(base) + 1:] if base else rel, pat) if anchored else fnmatch(name, pat):
+            ignored = not negate
+    return ignored
+
+
+@app.function
+def internal_tidy_targets(
+    root: str = '.', # directory to clean
+) -> list[str]:      # cache directories and stray .pyc files to remove
+    "Single pruned walk collecting everything tidy removes."
+    targets, stack = [], [(root, '', internal_ignore_rules(root, ''))]
+    while stack:
+        d, rel, rules = stack.pop()
+        with os.scandir(d) as it:
+            for e in it:
+                sub = f'{rel}/{e.name}' if rel else e.name
+                if not e.is_dir(follow_symlinks=False):
+                    if e.name.endswith(TIDY_SUFFIXES): targets.append(e.path)
+                elif e.name in TIDY_DIRS: targets.append(e.path)
+                elif e.name == '.git' or os.path.exists(os.path.join(e.path, 'pyvenv.cfg')): continue
+                elif not internal_ignored(sub, rules):
+                    stack.append((e.path, sub, rules + internal_ignore_rules(e.path, sub)))
+    cache = os.path.join(root, '.marimo-dev', 'cache')
+    if os.path.isdir(cache): targets.append(cache)
+    return targets
+
+
+@app.function
+def internal_reclaim(
+    path: str,      # file or directory to remove
+    dry_run: bool,  # only measure
+) -> tuple[int, int]: # (files, bytes) it held
+    "Size a path, then delete it unless dry_run."
+    import shutil
+    files = size = 0
+    if os.path.isdir(path):
+        stack = [path]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False): stack.append(e.path)
+                    else: files, size = files + 1, size + e.stat(follow_symlinks=False).st_size
+        if not dry_run: shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            files, size = 1, os.lstat(path).st_size
+            if not dry_run: os.unlink(path)
+        except OSError: return 0, 0
+    return files, size
+
+
+@app.function
+def tidy(
+    root: str = '.',       # directory to clean
+    dry_run: bool = False, # list what would go, delete nothing
+) -> tuple[int, int]:      # (files, bytes) reclaimed
     "Remove cache and temporary files."
-    for pattern in ('__pycache__', '__marimo__', '.pytest_cache'):
-        for p in Path('.').rglob(pattern): shutil.rmtree(p, ignore_errors=True)
-    for p in Path('.').rglob('*.pyc'): p.unlink(missing_ok=True)
-    print("Cleaned cache files")
+    from concurrent.futures import ThreadPoolExecutor
+    targets = internal_tidy_targets(root)
+    with ThreadPoolExecutor() as pool:
+        sizes = list(pool.map(internal_reclaim, targets, [dry_run] * len(targets)))
+    files, size = sum(f for f, _ in sizes), sum(b for _, b in sizes)
+    if dry_run: print(*sorted(targets), sep='\n')
+    print(f"{'Would remove' if dry_run else 'Removed'} {len(targets):,} paths, "
+          f"{files:,} files, {size / 1024:,.1f} KB")
+    return files, size
 
 
 @app.function
 def nuke():
     "Remove all build artifacts and cache files."
+    import shutil
     tidy()
     for d in ('dist', 'docs', 'src', 'temp'):
         shutil.rmtree(d, ignore_errors=True)
     print("Nuked build artifacts")
 
 
+@app.function
+def internal_split_args(
+    argv: list[str],                   # arguments after the command name
+) -> tuple[list[str], dict[str, str]]: # (positional args, {flag: value})
+    "Split argv into positionals and flags. Accepts '-j 4', '-j4' and '--flag=value'."
+    args, opts, it = [], {}, iter(argv)
+    for a in it:
+        if not a.startswith('-'): args.append(a)
+        elif a in VALUE_FLAGS: opts[a] = next(it, '')
+        elif a[:2] in VALUE_FLAGS: opts[a[:2]] = a[2:]
+        else:
+            k, _, v = a.partition('=')
+            opts[k] = v
+    return args, opts
+
+
 @app.function
 def main():
-    "Entry point for the md command."
+    """Entry point for the md command.
+
+    --profile records phase spans to .marimo-dev/profile.json and prints a
+    summary; --profile=cprofile also dumps cProfile stats next to it.
+    """
     if len(sys.argv) < 2:
-        print("Usage: md [build|docs|bundle|publish|tidy|nuke]")
+        print(USAGE)
         sys.exit(1)
 
     cmd = sys.argv[1]
+    args, opts = internal_split_args(sys.argv[2:])
+    # A running `md serve` answers build/docs/bundle/dist unless the call needs a fresh parse or profile
+    if cmd in SERVED and not {'--profile', '--no-cache', '-j'} & opts.keys():
+        from m_serve import request
+        if reply := request(sys.argv[1:]):
+            out, code = reply
+            print(out, end='')
+            if code: sys.exit(code)
+            return
+    if '--profile' not in opts: return internal_dispatch(cmd, args, opts)
+
+    from l_profiling import span, start_profile, write_profile
+    trace = start_profile(cprofile=opts['--profile'] == 'cprofile')
+    try:
+        with span(f'md {cmd}'): internal_dispatch(cmd, args, opts)
+    finally:
+        print(write_profile(trace))
+
 
-    if cmd == 'tidy':  tidy(); return
+@app.function
+def internal_dispatch(
+    cmd: str,               # command name, e.g. 'build'
+    args: list[str],        # positional arguments after it
+    opts: dict[str, str],   # flags from _split_args
+):
+    "Run one md command, reading the project first when it needs one."
+    if cmd == 'tidy':  tidy(dry_run='--dry-run' in opts); return
     if cmd == 'nuke':  nuke(); return
+    if cmd == 'bench':
+        from k_bench import bench
+        shape = {k: int(opts[f'--{k}']) for k in ('modules', 'exports', 'params', 'setup') if f'--{k}' in opts}
+        if '--no-renames' in opts: shape['renames'] = False
+        print(bench(repeat=int(opts.get('--repeat') or 3), **shape)); return
 
     # Everything else needs the project
-    proj = read_project()
+    overrides = internal_overrides(opts)
+    if cmd == 'watch':
+        from i_watch import watch
+        watch(html='--html' in opts, **overrides); return
+    if cmd == 'serve':
+        from m_serve import request, serve
+        if '--stop' not in opts: serve(internal_served, daemon='--daemon' in opts, **overrides)
+        else: print(reply[0] if (reply := request(['stop'])) else "md serve is not running")
+        return
+
+    from b_parse import read_project
+    from l_profiling import span
+    try:
+        with span('read_project'): proj = read_project(**overrides)
+    except ExceptionGroup as eg:
+        print(eg.message)
+        for e in eg.exceptions:
+            print(f"  {type(e).__name__}: {e}", *getattr(e, '__notes__', ()), sep='\n    ')
+        sys.exit(1)
+    internal_command(proj, cmd, args, opts)
+
+
+@app.function
+def internal_overrides(
+    opts: dict[str, str], # flags from _split_args
+) -> dict:                # Config overrides for read_project
+    "Config fields set by command-line flags."
+    overrides = {}
+    if '--no-cache' in opts: overrides['cache'] = False
+    if '-j' in opts:
+        if not (opts['-j'] or '0').isdecimal():
+            print(f"-j expects a number of processes (0 = one per CPU), got {opts['-j']!r}")
+            print(USAGE)
+            sys.exit(1)
+        overrides['jobs'] = int(opts['-j'] or 0)
+    if '--split' in opts: overrides['docs_split'] = True
+    if '--compress' in opts: overrides['compress'] = True
+    return overrides
+
 
-    
+@app.function
+def internal_served(
+    proj: 'Project',              # the daemon's current project
+    argv: list[str],            # client arguments, e.g. ['docs', '--split']
+    only: set[str] | None,      # modules changed since the last build, None for all
+):
+    "Run a client's command in the daemon, with its flags applied to the held Config."
+    from dataclasses import replace
+    args, opts = internal_split_args(argv[1:])
+    if overrides := internal_overrides(opts): proj = replace(proj, config=replace(proj.config, **overrides))
+    internal_command(proj, argv[0], args, opts, only)
+
+
+@app.function
+def internal_command(
+    proj: 'Project',              # complete parsed project
+    cmd: str,                   # command name, e.g. 'build'
+    args: list[str],            # positional arguments after it
+    opts: dict[str, str],       # flags from _split_args
+    only: set[str] | None = None, # modules to rerender on build, None for all
+):
+    "Run one project command, importing only the modules it uses."
+    from l_profiling import span
     if cmd == 'build':
-        pkg = build(proj)
-        build_docs(proj)
+        from c_build_pkg import build
+        from d_build_docs import build_docs
+        with span('build'): pkg = build(proj, only)
+        with span('build_docs'): build_docs(proj)
         print(f"Built package at: {pkg}")
+        if '--timings' in opts:
+            from c_build_pkg import import_timings
+            try: t = import_timings(proj)
+            except ImportError as e: print(f"No import timings: {e}")
+            else: print(f"import {proj.meta.pkg_name}: eager {t['eager']:.1f} ms, lazy {t['lazy']:.1f} ms")
 
     elif cmd == 'docs':
-        print(build_docs(proj))
-        print(build_docs_html(proj))
+        from d_build_docs import build_docs
+        from g_build_docs_html import build_docs_html
+        with span('build_docs'): print(build_docs(proj))
+        with span('build_docs_html'): print(build_docs_html(proj))
 
     elif cmd == 'bundle':
-        name = sys.argv[2] if len(sys.argv) > 2 else None
-        print(bundle(proj, name=name))
+        from c_build_pkg import build_pyz, bundle
+        name = args[0] if args else None
+        roots = opts['--roots'].split(',') if opts.get('--roots') else None
+        try:
+            if name and name.endswith('.pyz'): print(build_pyz(proj, name))
+            else: print(bundle(proj, name=name, shake='--shake' in opts or roots is not None, roots=roots,
+                               optimize='--optimize' in opts))
+        except ValueError as e:  # includes graphlib.CycleError from topo_modules
+            sys.exit(f"md bundle: {e.args[0]}")
+
+    elif cmd == 'dist':
+        from e_publish import dist
+        dist(proj)
+
+    elif cmd == 'importtime':
+        from j_importtime import write_importtime
+        print(write_importtime(proj, opts.get('--json', '')))
 
     elif cmd == 'publish':
-        test = '--test' in sys.argv or '-t' in sys.argv
+        from e_publish import publish
+        test = '--test' in opts or '-t' in opts
         target = "TestPyPI" if test else "PyPI"
         if input(f"Publish to {target}? [y/N] ").lower() != 'y':
             print("Aborted"); sys.exit(0)
@@ -87,6 +326,62 @@ def main():
         sys.exit(1)
 
 
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Startup
+
+    Regression test for the deferred imports above: runs `md tidy` and
+    `md build` from the committed `src/marimo_dev` in a small synthetic
+    project, checks under `python -X importtime` which modules they load,
+    and checks their wall-clock time, best of three, against a generous
+    multiple of a bare `python -c pass` on the same machine.
+    """)
+    return
+
+
+@app.function
+def test_startup_imports():
+    "The committed marimo_dev: md tidy and md build load only their own modules and start within budget."
+    import subprocess, tempfile, time
+    from pathlib import Path
+    from k_bench import synth_project
+
+    allowed = {
+        'tidy':  {'marimo_dev', 'marimo_dev.cli'},
+        'build': {'marimo_dev', 'marimo_dev.cli', 'marimo_dev.serve', 'marimo_dev.profiling', 'marimo_dev.types',
+                  'marimo_dev.cache', 'marimo_dev.parse', 'marimo_dev.build_pkg', 'marimo_dev.build_docs'},
+    }
+    # wall-clock budget in multiples of a bare interpreter start; build also parses and writes the project
+    budget = {'tidy': 10, 'build': 40}
+    src = Path(__file__).resolve().parents[1] / 'src'
+    code = "import sys; sys.argv = ['md', *sys.argv[1:]]; from marimo_dev.cli import main; main()"
+    env = {**os.environ, 'PYTHONPATH': str(src)}
+
+    def best(args, cwd):
+        times = []
+        for _ in range(3):
+            t = time.perf_counter()
+            subprocess.run(args, cwd=cwd, capture_output=True, env=env, check=True)
+            times.append(time.perf_counter() - t)
+        return min(times)
+
+    with tempfile.TemporaryDirectory() as d:
+        proj = synth_project(f'{d}/proj', modules=2, exports=2)
+        bare = best([sys.executable, '-c', 'pass'], proj)
+        for cmd, mods in allowed.items():
+            r = subprocess.run([sys.executable, '-X', 'importtime', '-c', code, cmd], cwd=proj, capture_output=True,
+                               text=True, env=env)
+            assert r.returncode == 0, f"md {cmd} failed:\n{r.stderr[-2000:]}"
+            cum = {line.split('|')[2].strip(): int(line.split('|')[1])
+                   for line in r.stderr.splitlines() if line.startswith('import time:') and 'cumulative' not in line}
+            loaded = {m for m in cum if m.split('.')[0] == 'marimo_dev'}
+            assert loaded <= mods, f"md {cmd} imported {sorted(loaded - mods)}"
+            assert not {'html_tags', 'configparser'} & cum.keys(), f"md {cmd} imported html_tags/configparser"
+            took = best([sys.executable, '-c', code, cmd], proj)
+            assert took < budget[cmd] * bare, f"md {cmd}: {took * 1e3:.0f} ms, over {budget[cmd]}x bare python ({bare * 1e3:.0f} ms)"
+
+
 @app.cell
 def _():
     import marimo as mo
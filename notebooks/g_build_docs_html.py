@@ -10,15 +10,33 @@ with app.setup:
     switching. The parse step has already extracted everything needed — this
     module is pure transformation from typed data to tag tree.
 
+    With `docs_split` each module gets its own page ({module}.html) holding only
+    that module's panel; the tabs become links and index.html is the first
+    module's page. A `#module_export` anchor on the wrong page redirects to the
+    page that has it.
+
+    Search: build_docs_html also writes search.json, an inverted index from
+    name/doc/parameter tokens to exports. The page fetches it on the first
+    keystroke in the search box and answers prefix queries client-side.
+
+    build_docs_html streams: iter_page renders the page around two markers, then
+    renders and yields one module panel (and sidebar list) at a time in their place,
+    collecting each panel's tag tree before the next is built.
+
     Layout: app-style grid
       header → project name + version + description
       nav    → module tabs (drive the $current signal)
       main   → the active module's exports (signature + docstring + source)
       aside  → on-this-page anchors for the active module
     """
-    import json
+    import gc, json, re
     import html_tags as h
     from  a_types import Project, Module, Export, Param, Return, ExportKind
+    from d_build_docs import COMPRESSED, compress_docs, drop_compressed, prune_docs, write_stream
+    from l_profiling import span
+
+    PANELS_MARKER  = '@@MARIMO_DEV_PANELS@@'   # stands in for <main>'s panels in iter_page
+    SIDEBAR_MARKER = '@@MARIMO_DEV_SIDEBAR@@'  # stands in for the sidebar lists in iter_page
 
 
 @app.cell
@@ -195,14 +213,108 @@ def render_module_panel(
     )
 
 
+@app.function
+# ── Search ───────────────────────────────────────────────────────────────────
+
+def internal_tokens(
+    text: str, # names, docstrings, parameter docs
+) -> set[str]: # lowercase search terms
+    "Words of text, plus the pieces of snake_case and CamelCase identifiers."
+    out = set()
+    for word in re.findall(r'\w+', text):
+        out.add(word.lower())
+        out.update(p.lower() for p in re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+', word))
+    return {t for t in out if len(t) > 1}
+
+
+@app.function
+def build_search_index(
+    proj, # Project
+):        # {'mods', 'pages', 'docs': [[mod, name, original, summary]], 'terms': sorted, 'ids': doc ids per term}
+    "Inverted index over every documented export: names, docstring, parameters, methods and module name."
+    modules = proj.nonempty_modules
+    docs, terms = [], {}
+    for mi, mod in enumerate(modules):
+        for exp in mod.documented_exports:
+            text = [mod.name, exp.name, exp.final_name, exp.doc]
+            for p in exp.params: text += [p.name, p.doc]
+            for m in exp.methods: text += [m.name, m.doc]
+            for t in internal_tokens(' '.join(text)): terms.setdefault(t, []).append(len(docs))
+            summary = exp.doc.strip().split('\n')[0][:100]
+            docs.append([mi, exp.final_name, exp.name if exp.name != exp.final_name else '', summary])
+    # Terms as a sorted list rather than object keys: JS puts integer-like keys first.
+    keys = sorted(terms)
+    return {'mods': [m.name for m in modules], 'pages': [page_file(m.name) for m in modules],
+            'docs': docs, 'terms': keys, 'ids': [terms[k] for k in keys]}
+
+
+@app.function
+def render_search(
+    split: bool, # links go to other pages (split mode) rather than switching $current
+):               # search box plus an (initially empty) result list
+    "Search box; the first keystroke fetches search.json, later ones reuse it."
+    # Every query token must prefix-match some term; exact and leading name matches rank first.
+    # Plain string concatenation: Datastar reads $name in expressions as a signal.
+    on_input = (
+        "const q = el.value.trim().toLowerCase(); "
+        "const box = document.getElementById('search-results'); "
+        "if (!q) { box.innerHTML = ''; return; } "
+        "window.mdSearch = window.mdSearch || fetch('search.json').then(r => r.json()); "
+        "window.mdSearch.then(ix => { "
+        "const keys = ix.terms; "
+        "const hits = (q.match(/\\w+/g) || []).map(t => { "
+        "let lo = 0, hi = keys.length; "
+        "while (lo < hi) { const mid = (lo + hi) >> 1; if (keys[mid] < t) lo = mid + 1; else hi = mid; } "
+        "const ids = new Set(); "
+        "for (let i = lo; i < keys.length && keys[i].startsWith(t); i++) ix.ids[i].forEach(d => ids.add(d)); "
+        "return ids; }); "
+        "const found = hits.length ? [...hits[0]].filter(d => hits.every(s => s.has(d))) : []; "
+        "const rank = d => { const n = ix.docs[d][1].toLowerCase(); "
+        "return n === q ? 0 : n.startsWith(q) ? 1 : n.includes(q) ? 2 : 3; }; "
+        "const esc = s => s.replace(/[&<>\"]/g, c => '&#' + c.charCodeAt(0) + ';'); "
+        "box.innerHTML = found.sort((a, b) => rank(a) - rank(b)).slice(0, 20).map(d => { "
+        "const [m, name, orig, sum] = ix.docs[d]; const mod = ix.mods[m]; "
+        + ("const href = ix.pages[m] + '#' + mod + '_' + name; "
+           if split else "const href = '#' + mod + '_' + name; ")
+        + "return '<li><a href=\"' + href + '\" data-mod=\"' + mod + '\">' + esc(name) + '</a> "
+        "<small style=\"--contrast: 0.6\">' + mod + (orig ? ' · ' + esc(orig) : '') + '</small>' "
+        "+ (sum ? '<br><small>' + esc(sum) + '</small>' : '') + '</li>'; }).join('') "
+        "|| '<li><small>No matches</small></li>'; });"
+    )
+    results = {"id": "search-results", "role": "list", "class": "stack", "style": "--space: -1"}
+    if not split:
+        results["data-on:click"] = "const a = evt.target.closest('a[data-mod]'); if (a) $current = a.dataset.mod;"
+    return h.div({"class": "stack"},
+        h.input({"type": "search", "placeholder": "Search", "aria-label": "Search exports",
+                 "data-on:input__debounce.100ms": on_input}),
+        h.ul(results),
+    )
+
+
 @app.function
 # ── Navigation & sidebar ─────────────────────────────────────────────────────
 
+def page_file(
+    name: str, # module name
+) -> str:      # file name of that module's page in split mode
+    "Page for a module; a module called index must not clobber the shell page."
+    return 'index-module.html' if name == 'index' else f'{name}.html'
+
+
+@app.function
 def render_tabs(
-    proj, # Project
-):        # nav element with a button per module
+    proj,         # Project
+    current=None, # module name of this page in split mode, None for the single page
+):                # nav element with a button (or link, in split mode) per module
     "Render the tab strip — each button flips $current to that module name."
     modules = proj.nonempty_modules
+    if current is not None:
+        links = [
+            h.a({"class": "btn active" if m.name == current else "btn",
+                 "href": page_file(m.name)}, m.name)
+            for m in modules
+        ]
+        return h.div({"class": "stack"})(*links)
     buttons = [
         h.button(
             {"class": "btn",
@@ -215,28 +327,37 @@ def render_tabs(
     return h.div({"class": "stack"})(*buttons)
 
 
+@app.function
+def render_sidebar_list(
+    mod, # Module
+):       # this module's on-this-page list, or None without public exports
+    "One module's 'on this page' list, visible while it is the active module."
+    if not mod.public_exports: return None
+    items = [
+        h.li(h.a({
+            "href": f"#{_export_id(mod, exp)}",
+            "data-on:click": f"$current = '{mod.name}'",
+        })(exp.final_name))
+        for exp in mod.public_exports
+    ]
+    return h.div(
+        {"data-show": f"$current === '{mod.name}'"},
+        h.small({"style": "--contrast: 0.6"})("ON THIS PAGE"),
+        h.ul({"role": "list", "class": "stack", "style": "--space: -1"},
+             *items),
+    )
+
+
 @app.function
 def render_sidebar(
-    proj, # Project
-):        # aside content — per-module on-this-page lists (only active one visible)
+    proj,         # Project
+    current=None, # only list this module (split mode), None for all
+    lists=None,   # children of the sidebar, defaults to every shown module's list
+):                # aside content — per-module on-this-page lists (only active one visible)
     "Render the 'on this page' sidebar, scoped to the active module."
-    lists = []
-    for mod in proj.nonempty_modules:
-        if not mod.public_exports: continue
-        items = [
-            h.li(h.a({
-                "href": f"#{_export_id(mod, exp)}",
-                "data-on:click": f"$current = '{mod.name}'",
-            })(exp.final_name))
-            for exp in mod.public_exports
-        ]
-        lists.append(h.div(
-            {"data-show": f"$current === '{mod.name}'"},
-            h.small({"style": "--contrast: 0.6"})("ON THIS PAGE"),
-            h.ul({"role": "list", "class": "stack", "style": "--space: -1"},
-                 *items),
-        ))
-    return h.div({"class": "stack"})(*lists)
+    if lists is None:
+        lists = [render_sidebar_list(m) for m in proj.nonempty_modules if current in (None, m.name)]
+    return h.div({"class": "stack"})(*[l for l in lists if l is not None])
 
 
 @app.function
@@ -266,28 +387,34 @@ def render_header(
 # ── Full page ────────────────────────────────────────────────────────────────
 
 def render_page(
-    proj, # the complete parsed Project
-):        # a Safe string of the complete HTML document
-    "Assemble the full HTML page for a Project."
+    proj,         # the complete parsed Project
+    current=None, # module name for a split-mode page, None for every module on one page
+    main=None,    # children of <main>, defaults to the shown modules' panels
+    sidebar=None, # children of the sidebar, defaults to the shown modules' lists
+):                # a Safe string of the complete HTML document
+    "Assemble the full HTML page for a Project, or one module's page in split mode."
     modules = proj.nonempty_modules
     if not modules:
         return h.html_doc(h.head(h.title("No modules")), h.body(h.p("Empty project")))
 
-    # Initial signal: show the first module
-    init_current = modules[0].name
+    # Initial signal: this page's module, or the first one
+    init_current = current or modules[0].name
+    shown = [m for m in [proj.by_name.get(current)] if m and m.has_exports] if current else modules
 
     # On load: if the URL hash contains a module_export anchor, switch to that module.
-    # Expression parses '#utils_foo' → 'utils' and sets $current if it's a valid module.
+    # '#build_pkg_foo' → the longest module name it starts with, so names may contain '_'.
+    # In split mode the other modules live on other pages, so go there instead.
     module_names_js = json.dumps([m.name for m in modules])
+    switch = ("if (match && match !== $current) location.replace(pages[match] + location.hash);"
+              if current else "if (match) $current = match;")
     on_load = (
         f"const mods = {module_names_js}; "
-        "const hash = location.hash.slice(1); "
+        + (f"const pages = {json.dumps({m.name: page_file(m.name) for m in modules})}; " if current else "")
+        + "const hash = location.hash.slice(1); "
         "if (!hash) return; "
-        # If hash is a plain module name, use it. Otherwise strip to first '_' segment.
-        "const exact = mods.includes(hash) ? hash : null; "
-        "const prefix = hash.includes('_') ? hash.split('_')[0] : null; "
-        "const match = exact || (mods.includes(prefix) ? prefix : null); "
-        "if (match) $current = match;"
+        "const match = mods.filter(m => hash === m || hash.startsWith(m + '_'))"
+        ".sort((a, b) => b.length - a.length)[0]; "
+        + switch
     )
 
     body_content = h.body(
@@ -298,20 +425,21 @@ def render_page(
             render_header(proj),
         ),
         h.nav({"id": "nav", "style": "padding: var(--s)"})(
-            render_tabs(proj),
+            render_search(current is not None),
+            render_tabs(proj, current),
         ),
         h.main({"id": "main", "class": "surface", "style": "padding: var(--s)"},
-            *[render_module_panel(m) for m in modules],
+            *(main if main is not None else [render_module_panel(m) for m in shown]),
         ),
         h.aside({"id": "aside", "style": "padding: var(--s)"})(
-            render_sidebar(proj),
+            render_sidebar(proj, current, sidebar),
         ),
     )
 
     head_content = h.head(
         h.meta(charset="utf-8"),
         h.meta(name="viewport", content="width=device-width, initial-scale=1"),
-        h.title(f"{proj.meta.name} docs" if proj.meta.name else "Documentation"),
+        h.title(" · ".join(filter(None, [current, f"{proj.meta.name} docs" if proj.meta.name else "Documentation"]))),
         h.Favicon("📚"),
         h.Color_type_css(),
         h.Pointer(),
@@ -322,18 +450,84 @@ def render_page(
     return h.html_doc(head_content, body_content)
 
 
+@app.function
+def internal_render_at(
+    nodes,  # tags to render in order, None entries skipped
+    after,  # page text right after the marker they replace: newline, closing tag
+):          # yields each node's HTML, newline-separated as h.render joins siblings
+    """Render tags one at a time at the marker's indent, so the page matches render_page byte for byte.
+
+    A tag tree is a web of self-referencing closures that only the cycle
+    collector frees, so each tree is collected once it is rendered; without
+    that, peak memory grows with the number of panels.
+    """
+    closing = after.lstrip('\n')
+    depth = (len(closing) - len(closing.lstrip(' '))) // 2 + 1
+    sep = ''
+    for node in nodes:
+        if node is None: continue
+        html = h.render(node, depth=depth)
+        del node
+        gc.collect(1)
+        yield sep + html
+        sep = '\n'
+
+
+@app.function
+def iter_page(
+    proj,         # the complete parsed Project
+    current=None, # module name for a split-mode page, None for every module on one page
+):                # yields the HTML document in chunks, one per module panel or sidebar list
+    "Stream render_page: only one module's tag tree exists at a time."
+    modules = proj.nonempty_modules
+    shown = [m for m in [proj.by_name.get(current)] if m and m.has_exports] if current else modules
+    if not shown:
+        yield render_page(proj, current)
+        return
+    page = render_page(proj, current, main=[h.Safe(PANELS_MARKER)], sidebar=[h.Safe(SIDEBAR_MARKER)])
+    gc.collect()
+    head, _, rest = page.partition(PANELS_MARKER)
+    middle, _, tail = rest.partition(SIDEBAR_MARKER)
+    yield head
+    yield from internal_render_at((render_module_panel(m) for m in shown), middle)
+    yield middle
+    yield from internal_render_at((render_sidebar_list(m) for m in shown), tail)
+    yield tail
+
+
 @app.function
 def build_docs_html(
     proj,       # complete parsed Project
     path=None,  # output path, defaults to {root}/{docs}/index.html
 ):              # status message
-    "Write index.html alongside the existing llms.* files."
+    "Write index.html alongside the existing llms.* files, plus one page per module with docs_split."
     from pathlib import Path
     docs = Path(proj.config.root) / proj.config.docs
     docs.mkdir(parents=True, exist_ok=True)
     out = Path(path) if path else docs / 'index.html'
-    out.write_text(str(render_page(proj)))
-    return f"Wrote HTML docs to {out}"
+    modules = proj.nonempty_modules
+    if not (proj.config.docs_split and modules):
+        with span('page', page=out.name): write_stream(out, iter_page(proj))
+        written, msg = [out], f"Wrote HTML docs to {out}"
+    else:
+        written = [out.parent / page_file(m.name) for m in modules]
+        for m, page in zip(modules, written):
+            with span('page', page=page.name): write_stream(page, iter_page(proj, m.name))
+        with span('page', page=out.name): write_stream(out, iter_page(proj, modules[0].name))
+        written.insert(0, out)
+        msg = f"Wrote HTML docs to {out} + {len(modules)} module pages"
+    if modules:
+        with span('search.json'):
+            write_stream(out.parent / 'search.json', json.JSONEncoder(separators=(',', ':')).iterencode(build_search_index(proj)))
+        written.append(out.parent / 'search.json')
+    if proj.config.compress:
+        with span('compress'): msg += '\n' + compress_docs(written)
+    else:
+        drop_compressed(written)
+    siblings = [p.with_name(p.name + ext) for p in written for ext in COMPRESSED]
+    removed = prune_docs(proj.config.root, 'html', written + [p for p in siblings if p.exists()])
+    if removed: msg += f"\nRemoved: {', '.join(removed)}"
+    return msg
 
 
 @app.cell
@@ -0,0 +1,150 @@
+import marimo
+
+__generated_with = "0.23.1"
+app = marimo.App(width="medium", app_title="")
+
+with app.setup:
+    from dataclasses import dataclass, field
+    from importlib import metadata
+    from pathlib import Path
+    import hashlib, json, os, pickle, sys
+
+    from a_types import Config, ParsedFile
+
+    CACHE_DIR = '.marimo-dev/cache'
+    CACHE_FORMAT = 5  # bump when the parse changes through code outside the hashed modules
+
+
+@app.cell
+def _():
+    import marimo as mo
+
+    return (mo,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    # marimo-dev.cache
+
+    On-disk cache of `ParsedFile` results, one pickle per notebook content.
+
+    ```
+    .marimo-dev/cache/
+      index.json        path → [mtime_ns, size, key]   (cheap stat check)
+      <key>.pickle      ParsedFile for that content
+    ```
+
+    The key is a sha256 of the notebook bytes plus a fingerprint of
+    everything else that shapes the parse: `Config.renames`,
+    `Config.skip_prefixes`, `Config.source_spans`, the source of the
+    parser and types modules (so editable and git installs never reuse
+    stale parses), the Python minor version (`ast.unparse` output differs
+    between them), the marimo-dev version and `CACHE_FORMAT`.
+    An unchanged stat skips hashing entirely; a changed stat with the
+    same bytes (touch, checkout) still hits on the content key.
+    """)
+    return
+
+
+@app.function
+def internal_fingerprint(
+    cfg: Config,      # project configuration
+    code: tuple = (), # source files of the parser, hashed along with the types module
+) -> bytes:           # bytes mixed into every cache key
+    "Everything besides the notebook bytes that affects the parse result."
+    try: version = metadata.version('marimo-dev')
+    except metadata.PackageNotFoundError: version = '0'
+    h = hashlib.sha256()
+    for f in sorted({*map(str, code), sys.modules[ParsedFile.__module__].__file__}):
+        h.update(Path(f).read_bytes())
+    return repr((CACHE_FORMAT, version, sys.version_info[:2], h.hexdigest(), sorted(cfg.renames.items()),
+                 tuple(cfg.skip_prefixes), cfg.source_spans)).encode()
+
+
+@app.class_definition
+@dataclass
+class ParseCache:
+    "Content-addressed ParsedFile cache under {root}/.marimo-dev/cache."
+    path: Path                                  # cache directory
+    salt: bytes                                 # config/version fingerprint
+    limit: int = 64 * 2**20                     # max bytes of pickles kept
+    index: dict = field(default_factory=dict)   # str(path) → [mtime_ns, size, key]
+    pending: dict = field(default_factory=dict) # str(path) → [mtime_ns, size, key] awaiting store
+    dirty: bool = False                         # index needs saving
+
+    @classmethod
+    def open(
+        cls,              # ParseCache class
+        cfg: Config,      # project configuration
+        code: tuple = (), # source files of the parser, e.g. (__file__,) from the parse module
+    ) -> 'ParseCache':
+        "Load the index for a project; a missing or corrupt index starts empty."
+        path = Path(cfg.root) / CACHE_DIR
+        try: index = json.loads((path / 'index.json').read_text())
+        except (OSError, ValueError): index = {}
+        return cls(path=path, salt=internal_fingerprint(cfg, code), limit=cfg.cache_size * 2**20, index=index)
+
+    def lookup(
+        self,                   # ParseCache instance
+        f: Path,                # notebook file
+    ) -> ParsedFile | None:     # cached parse or None on miss
+        "Stat first, hash only if the stat changed, then load the pickle."
+        st = f.stat()
+        entry = self.index.get(str(f))
+        if entry and entry[:2] == [st.st_mtime_ns, st.st_size]:
+            key = entry[2]
+        else:
+            key = hashlib.sha256(self.salt + f.read_bytes()).hexdigest()
+        stamp = [st.st_mtime_ns, st.st_size, key]
+        try:
+            with open(self.path / f'{key}.pickle', 'rb') as fh: parsed = pickle.load(fh)
+        except Exception:
+            self.pending[str(f)] = stamp
+            return None
+        if entry != stamp:
+            self.index[str(f)] = stamp
+            self.dirty = True
+        return parsed
+
+    def store(
+        self,                  # ParseCache instance
+        f: Path,               # notebook file that missed in lookup()
+        parsed: ParsedFile,    # freshly parsed result
+    ):
+        "Write a parse result, unless the file changed since lookup()."
+        stamp = self.pending.pop(str(f), None)
+        if stamp is None: return
+        st = f.stat()
+        if stamp[:2] != [st.st_mtime_ns, st.st_size]: return
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f'{stamp[2]}.{os.getpid()}.tmp'
+        tmp.write_bytes(pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, self.path / f'{stamp[2]}.pickle')
+        self.index[str(f)] = stamp
+        self.dirty = True
+
+    def save(
+        self, # ParseCache instance
+    ):
+        "Evict least recently written pickles over the size limit, then write the index."
+        if not self.dirty: return
+        self.path.mkdir(parents=True, exist_ok=True)
+        entries = sorted((st.st_mtime_ns, st.st_size, p)
+                         for p in self.path.glob('*.pickle') if (st := p.stat()))
+        live = {e[2] for e in self.index.values()}
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.limit: break
+            p.unlink(missing_ok=True)
+            total -= size
+            live.discard(p.stem)
+        self.index = {k: v for k, v in self.index.items() if v[2] in live}
+        tmp = self.path / f'index.{os.getpid()}.tmp'
+        tmp.write_text(json.dumps(self.index))
+        os.replace(tmp, self.path / 'index.json')
+        self.dirty = False
+
+
+if __name__ == "__main__":
+    app.run()
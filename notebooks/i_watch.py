@@ -0,0 +1,232 @@
+import marimo
+
+__generated_with = "0.23.1"
+app = marimo.App(width="medium", app_title="")
+
+with app.setup:
+    from pathlib import Path
+    import ctypes, ctypes.util, os, select, struct, sys, time
+
+    from a_types import Project
+    from b_parse import read_project, refresh_project
+    from c_build_pkg import build
+    from d_build_docs import build_docs
+    from g_build_docs_html import build_docs_html
+
+    # inotify(7) event bits: file written & closed, renamed in/out, created, deleted
+    IN_EVENTS = 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+    IN_CLOEXEC = 0o2000000
+
+
+@app.cell
+def _():
+    import marimo as mo
+
+    return (mo,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    # marimo-dev.watch
+
+    `md watch` keeps a parsed Project in memory and rebuilds on save.
+
+    ```
+    change batch ──▶ pyproject.toml? ──yes──▶ read_project  (full)
+                          │ no
+                          ▼
+                     refresh_project  (changed notebooks only)
+                          │
+                     modules equal? ──yes──▶ nothing to do
+                          │ no
+                          ▼
+                     build (changed modules + their importers) + build_docs
+    ```
+
+    Changes come from inotify on Linux (via ctypes, no dependency) and from
+    stat polling of the two watched directories everywhere else. Both
+    debounce: a batch is only handed over once the directory has been quiet
+    for `debounce` seconds, so an editor's write-rename-chmod burst is one
+    rebuild.
+    """)
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Change sources
+    """)
+    return
+
+
+@app.function
+def internal_inotify(
+    dirs: list[Path],            # directories to watch (non-recursive)
+) -> tuple[int, dict] | None:    # (fd, {watch descriptor: dir}) or None if unavailable
+    "Set up inotify watches through libc, or None off Linux / on failure."
+    if not sys.platform.startswith('linux'): return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0: return None
+    wds = {}
+    for d in dirs:
+        wd = libc.inotify_add_watch(fd, os.fsencode(d), IN_EVENTS)
+        if wd < 0:
+            os.close(fd)
+            return None
+        wds[wd] = d
+    return fd, wds
+
+
+@app.function
+def internal_read_inotify(
+    fd: int,        # inotify file descriptor
+    wds: dict,      # watch descriptor → directory
+) -> set[Path]:     # paths named by the pending events
+    "Drain one read() worth of inotify events into paths."
+    buf, out, i = os.read(fd, 64 * 1024), set(), 0
+    while i < len(buf):
+        wd, _, _, n = struct.unpack_from('iIII', buf, i)
+        name = buf[i + 16:i + 16 + n].rstrip(b'\0')
+        if name and wd in wds: out.add(wds[wd] / os.fsdecode(name))
+        i += 16 + n
+    return out
+
+
+@app.function
+def snapshot(
+    dirs: list[Path], # directories to stat (non-recursive)
+) -> dict:            # path → (mtime_ns, size)
+    "Stat every entry of the watched directories with one scandir each."
+    snap = {}
+    for d in dirs:
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_file():
+                    st = e.stat()
+                    snap[d / e.name] = (st.st_mtime_ns, st.st_size)
+    return snap
+
+
+@app.function
+def watch_changes(
+    dirs: list[Path],       # directories to watch (non-recursive)
+    debounce: float = 0.05, # quiet period that ends a batch, in seconds
+    interval: float = 0.25, # polling period when inotify is unavailable
+):                          # yields sets of changed paths, one per burst
+    "Yield debounced batches of changed paths, via inotify or stat polling."
+    if ino := internal_inotify(dirs):
+        fd, wds = ino
+        try:
+            while True:
+                select.select([fd], [], [])
+                changed = internal_read_inotify(fd, wds)
+                while select.select([fd], [], [], debounce)[0]:
+                    changed |= internal_read_inotify(fd, wds)
+                yield changed
+        finally:
+            os.close(fd)
+
+    prev = snapshot(dirs)
+    while True:
+        time.sleep(interval)
+        cur = snapshot(dirs)
+        if cur == prev: continue
+        while True:
+            time.sleep(debounce)
+            nxt = snapshot(dirs)
+            if nxt == cur: break
+            cur = nxt
+        changed = {p for p in cur.keys() | prev.keys() if cur.get(p) != prev.get(p)}
+        prev = cur
+        yield changed
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Rebuild loop
+    """)
+    return
+
+
+@app.function
+def refresh(
+    proj: Project,     # project currently held in memory
+    changed: set[Path],# paths reported changed
+    root: str = '.',   # project root
+    **overrides,       # Config overrides, as for read_project
+) -> tuple[Project, set[str] | None] | None: # (new project, modules to rerender or None for all), None if nothing relevant changed
+    """Bring a held Project up to date with a batch of changed paths.
+
+    pyproject.toml means a full read_project; notebook changes reparse just
+    those notebooks, and, if the module set is unchanged, only they and
+    their importers need rendering. Parse errors propagate.
+    """
+    nbs, pyproject = Path(root) / proj.config.nbs, Path(root) / 'pyproject.toml'
+    changed = {p for p in changed if p == pyproject or (p.parent == nbs and p.suffix == '.py')}
+    if not changed: return None
+    if pyproject in changed: return read_project(root, **overrides), None
+    new = refresh_project(proj, changed, root)
+    stems = {p.stem for p in changed}
+    only = (new.dependents({m.name for m in new.modules if m.nb_stem in stems})
+            if new.mod_names == proj.mod_names else None)
+    return new, only
+
+
+@app.function
+def internal_rebuild(
+    proj: Project,   # project currently held in memory
+    html: bool,      # also render index.html
+    only: set[str] | None = None, # modules whose package files need rendering, None for all
+):
+    "Run the build stages that follow a parse."
+    build(proj, only)
+    build_docs(proj)
+    if html: build_docs_html(proj)
+
+
+@app.function
+def watch(
+    root: str = '.',   # project root containing pyproject.toml and notebooks
+    html: bool = False, # also rebuild index.html on every change
+    **overrides,        # Config overrides, as for read_project
+):
+    """Build once, then rebuild on every notebook or pyproject.toml save until Ctrl-C.
+
+    The notebook directory is fixed at startup; restart after changing `nbs`.
+    """
+    proj = read_project(root, **overrides)
+    internal_rebuild(proj, html)
+
+    nbs, pyproject = Path(root) / proj.config.nbs, Path(root) / 'pyproject.toml'
+    print(f"Watching {nbs} and {pyproject} (Ctrl-C to stop)")
+    try:
+        for changed in watch_changes([nbs, Path(root)]):
+            t0 = time.perf_counter()
+            try:
+                if not (fresh := refresh(proj, changed, root, **overrides)): continue
+            except (ExceptionGroup, OSError, ValueError) as e:
+                errs = e.exceptions if isinstance(e, ExceptionGroup) else (e,)
+                print("Parse failed, keeping last good build:", *errs, sep='\n  ')
+                continue
+            new, only = fresh
+            names = ', '.join(sorted(p.name for p in changed
+                                     if p == pyproject or (p.parent == nbs and p.suffix == '.py')))
+            if new == proj:
+                print(f"No export changes ({names}) in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+                continue
+            proj = new
+            internal_rebuild(proj, html, only)
+            print(f"Rebuilt ({names}) in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+
+if __name__ == "__main__":
+    app.run()
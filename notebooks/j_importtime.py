@@ -0,0 +1,152 @@
+import marimo
+
+__generated_with = "0.23.1"
+app = marimo.App(width="medium", app_title="")
+
+with app.setup:
+    from pathlib import Path
+    import json, os, re, subprocess, sys
+
+    from a_types import Project, Import
+    from c_build_pkg import build
+
+
+@app.cell
+def _():
+    import marimo as mo
+
+    return (mo,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    # marimo-dev.importtime
+
+    Which notebook makes `import mypkg` slow?
+
+    1. `build` the package (incremental, usually a no-op)
+    2. `python -X importtime -c "import pkg, pkg.mod, ..."` in a clean subprocess
+       (after one warm-up run, so bytecode compilation is not counted)
+    3. rebuild the import tree from stderr and hang each generated module's
+       cost, and the cost of the modules it was first to import, back on the
+       `Module` and the setup-cell `Import` lines of its notebook
+
+    Costs are first-importer costs: a dependency already loaded by an earlier
+    module is free for everyone after it, exactly as at runtime.
+    """)
+    return
+
+
+@app.function
+def internal_import_tree(
+    stderr: str,  # output of python -X importtime
+) -> dict:        # module name → {'self': us, 'cum': us, 'children': [names]}
+    "Rebuild the import tree. importtime prints children (one level deeper) before their parent."
+    nodes, pending = {}, {}
+    for line in stderr.splitlines():
+        m = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)', line)
+        if not m: continue
+        self_us, cum_us, pad, name = int(m[1]), int(m[2]), m[3], m[4]
+        depth = (len(pad) - 1) // 2
+        nodes.setdefault(name, {'self': self_us, 'cum': cum_us,
+                                'children': pending.pop(depth + 1, [])})
+        pending.setdefault(depth, []).append(name)
+    return nodes
+
+
+@app.function
+def internal_import_targets(
+    imp: Import,           # setup-cell import statement
+    pkg: str,              # built package name
+    mod_names: list[str],  # project module names, for cross-notebook imports
+) -> list[str]:            # absolute module names the statement loads
+    "Module names an import statement loads, with notebook imports mapped into the package."
+    src = imp.src.strip()
+    if src.startswith('from '):
+        mod = src.split()[1]
+        if mod.startswith('.'): return [f'{pkg}{mod}']
+        stripped = re.sub(r'^[a-z]_', '', mod)
+        return [f'{pkg}.{stripped}' if stripped in mod_names else mod]
+    if src.startswith('import '):
+        return [part.split(' as ')[0].strip() for part in src[len('import '):].split(',')]
+    return []
+
+
+@app.function
+def internal_subtree_cost(
+    nodes: dict,       # from _import_tree
+    parent: str,       # module whose first imports are considered
+    targets: list[str],# modules one import statement loads, e.g. ['a.b']
+) -> int:              # microseconds paid under parent for the statement
+    "Cumulative time of parent's children that are a target, a target's parent or submodule."
+    return sum(
+        nodes[c]['cum'] for c in nodes.get(parent, {}).get('children', [])
+        if any(c == t or t.startswith(c + '.') or c.startswith(t + '.') for t in targets)
+    )
+
+
+@app.function
+def importtime(
+    proj: Project, # complete parsed project
+) -> list[dict]:   # one row per generated module, most expensive first
+    "Build, run `python -X importtime` on the package and attribute cost to modules and imports."
+    build(proj)
+    cfg, pkg = proj.config, proj.meta.pkg_name
+    built = [m for m in proj.modules if m.name != 'index' and m.has_exports]
+    code = 'import ' + ', '.join([pkg] + [f'{pkg}.{m.name}' for m in built])
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(
+        filter(None, [str(Path(cfg.root) / cfg.out), os.environ.get('PYTHONPATH')]))}
+    run = lambda *x: subprocess.run([sys.executable, *x, '-c', code], env=env,
+                                    capture_output=True, text=True, check=True)
+    run()  # warm-up: write __pycache__ so compilation is not measured
+    nodes = internal_import_tree(run('-X', 'importtime').stderr)
+
+    mod_names, rows = proj.mod_names, []
+    for m in built:
+        node = nodes.get(f'{pkg}.{m.name}', {'self': 0, 'cum': 0})
+        imports = [
+            {'src': i.src, 'ms': internal_subtree_cost(
+                nodes, f'{pkg}.{m.name}', internal_import_targets(i, pkg, mod_names)) / 1e3}
+            for i in m.imports
+        ]
+        rows.append({
+            'module':   m.name,
+            'notebook': m.nb_stem,
+            'self_ms':  node['self'] / 1e3,
+            'cum_ms':   node['cum'] / 1e3,
+            'imports':  sorted(imports, key=lambda i: -i['ms']),
+        })
+    return sorted(rows, key=lambda r: -r['cum_ms'])
+
+
+@app.function
+def render_importtime(
+    rows: list[dict], # from importtime()
+) -> str:             # aligned text table
+    "Format importtime() rows as a table, each module followed by its costly imports."
+    w = max([len(r['module']) for r in rows] + [6])
+    lines = [f"{'module':<{w}}  {'self ms':>8}  {'cum ms':>8}  notebook"]
+    for r in rows:
+        lines.append(f"{r['module']:<{w}}  {r['self_ms']:>8.1f}  {r['cum_ms']:>8.1f}  {r['notebook']}")
+        for i in r['imports']:
+            if i['ms'] >= 0.1: lines.append(f"{'':<{w}}  {'':>8}  {i['ms']:>8.1f}    {i['src']}")
+    return '\n'.join(lines)
+
+
+@app.function
+def write_importtime(
+    proj: Project,   # complete parsed project
+    path: str = '',  # JSON output, defaults to {root}/.marimo-dev/importtime.json
+) -> str:            # table followed by where the JSON went
+    "Run importtime(), save the rows as JSON and return the rendered table."
+    rows = importtime(proj)
+    out = Path(path) if path else Path(proj.config.root) / '.marimo-dev' / 'importtime.json'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({'package': proj.meta.pkg_name, 'version': proj.meta.version,
+                               'modules': rows}, indent=2) + '\n')
+    return f"{render_importtime(rows)}\n\nWrote {out}"
+
+
+if __name__ == "__main__":
+    app.run()
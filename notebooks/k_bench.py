@@ -0,0 +1,337 @@
+import marimo
+
+__generated_with = "0.23.1"
+app = marimo.App(width="medium", app_title="")
+
+with app.setup:
+    from contextlib import chdir, redirect_stdout
+    from datetime import datetime, timezone
+    from importlib import metadata
+    from pathlib import Path
+    import dataclasses, io, json, platform, shutil, sys, tempfile, time, tracemalloc
+
+    from a_types import Export, Param, Return
+    from b_parse import read_project
+    from c_build_pkg import build, bundle
+    from d_build_docs import build_docs, render_llms_full, write_stream
+    from g_build_docs_html import build_docs_html, iter_page, render_page
+
+    STDLIB_IMPORTS = ('import json', 'import re', 'from pathlib import Path',
+                      'from dataclasses import dataclass', 'import functools', 'import itertools')
+    DEFAULT_SHAPE = {'modules': 20, 'exports': 50, 'params': 4, 'setup': 10, 'renames': True}
+
+
+@app.cell
+def _():
+    import marimo as mo
+
+    return (mo,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    # marimo-dev.bench
+
+    Benchmarks for marimo-dev itself, on a generated project.
+
+    ```
+    synth_project(root, ...)  → writes pyproject.toml + N synthetic notebooks
+    run_bench(root)           → {stage: {ms, peak_kb}} for read_project, build, bundle,
+                                render_llms_full, render_page (whole string in memory) and
+                                build_docs, build_docs_html (streamed to disk)
+    model_memory(proj)        → bytes per export held by the parse model, slotted and
+                                interned vs the same data as dict-backed dataclasses
+                                holding src and clean_src copies
+    md bench                  → all of it, in a temp dir; appends to .marimo-dev/bench.json
+                                and compares with the last run of the same shape
+    ```
+
+    Times are the best of `repeat` runs with tracemalloc off; peak memory
+    comes from one extra traced run per stage. `build` starts from an empty
+    output directory each time. The parse cache is off.
+    """)
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Synthetic corpus
+    """)
+    return
+
+
+@app.function
+def internal_synth_notebook(
+    i: int,           # module index
+    exports: int,     # exports in this notebook
+    params: int,      # parameters per export
+    setup: int,       # setup-cell statements
+    renames: bool,    # give every other export an internal_ name
+) -> str:             # notebook source
+    "One marimo notebook: a setup cell, then docments-style exports that call each other."
+    body = [STDLIB_IMPORTS[k % len(STDLIB_IMPORTS)] for k in range(min(setup, len(STDLIB_IMPORTS)))]
+    if i > 0: body.append(f'from nb{i - 1:03d} import m{i - 1}_f0')
+    body.append('REGISTRY = []')
+    body += [f'CONST_{i}_{k} = {k}' if k % 2 else f'REGISTRY.append({k})' for k in range(setup)]
+
+    def name(j): return f'internal_m{i}_f{j}' if renames and j % 2 else f'm{i}_f{j}'
+    cells = []
+    for j in range(exports):
+        sig = ''.join(f'    p{k}: int = {k}, # parameter {k} of {name(j)}\n' for k in range(params))
+        call = f'{name(j - 1)}() + ' if j else ''
+        cells.append(
+            f'@app.function\ndef {name(j)}(\n{sig}) -> int: # sum of the parameters\n'
+            f'    "Synthetic export {j} of module {i}, see {name(j)}."\n'
+            f'    return {call}' + (' + '.join(f'p{k}' for k in range(params)) or '0') + '\n'
+        )
+    setup_src = '\n'.join(f'    {line}' for line in body)
+    return ('import marimo\n\n__generated_with = "0.23.1"\napp = marimo.App()\n\n'
+            f'with app.setup:\n{setup_src}\n\n\n' + '\n\n'.join(cells) +
+            '\n\nif __name__ == "__main__":\n    app.run()\n')
+
+
+@app.function
+def synth_project(
+    root: str | Path,    # directory to write pyproject.toml and notebooks/ into
+    modules: int = 20,   # number of notebooks
+    exports: int = 50,   # exports per notebook
+    params: int = 4,     # parameters per export
+    setup: int = 10,     # setup-cell statements per notebook
+    renames: bool = True,# half the exports use the internal_ → _ rename
+) -> Path:               # the project root
+    "Write a synthetic marimo-dev project of the requested shape."
+    root = Path(root)
+    nbs = root / 'notebooks'
+    nbs.mkdir(parents=True, exist_ok=True)
+    (root / 'pyproject.toml').write_text(
+        '[project]\nname = "bench-pkg"\nversion = "0.0.0"\ndescription = "synthetic"\n\n'
+        '[tool.marimo-dev]\napplication = "nb000:m0_f0"\n\n'
+        '[tool.marimo-dev.renames]\n' + ('internal_ = "_"\n' if renames else '')
+    )
+    for i in range(modules):
+        (nbs / f'nb{i:03d}.py').write_text(internal_synth_notebook(i, exports, params, setup, renames))
+    return root
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Timing
+    """)
+    return
+
+
+@app.function
+def internal_measure(
+    fn,               # zero-argument callable for one stage
+    repeat: int,      # timed runs; the fastest wins
+    before=None,      # optional untimed reset run before every call
+) -> dict:            # {'ms': best wall time, 'peak_kb': tracemalloc peak}
+    "Best-of-n wall time, then one traced run for peak memory. Output is swallowed."
+    best = float('inf')
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            if before: before()
+            t = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t)
+        if before: before()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'ms': round(best * 1e3, 3), 'peak_kb': round(peak / 1024, 1)}
+
+
+@app.function
+def run_bench(
+    root: str | Path, # project root, e.g. from synth_project
+    repeat: int = 3,  # timed runs per stage
+) -> dict:            # stage name → {'ms', 'peak_kb'}
+    "Time each toolchain stage separately on an existing project (run from inside it, as md is)."
+    with chdir(root):
+        proj = read_project(cache=False)
+        out = proj.config.out
+        return {
+            'read_project':     internal_measure(lambda: read_project(cache=False), repeat),
+            'build':            internal_measure(lambda: build(proj), repeat,
+                                                 before=lambda: shutil.rmtree(out, ignore_errors=True)),
+            'bundle':           internal_measure(lambda: bundle(proj, 'bundle.py'), repeat),
+            'render_llms_full': internal_measure(lambda: render_llms_full(proj), repeat),
+            'render_page':      internal_measure(lambda: render_page(proj), repeat),
+            'build_docs':       internal_measure(lambda: build_docs(proj), repeat),
+            'build_docs_html':  internal_measure(lambda: build_docs_html(proj), repeat),
+        }
+
+
+@app.cell
+def _():
+    # Streaming writers: peak KB of render-then-write vs the streamed writers, smoke-sized.
+    # The render columns grow with the project; the llms and page streams stay at about one
+    # export / one panel. build_docs_html also builds search.json's index whole, which grows.
+    _rows = []
+    for _n in (2, 8):
+        with tempfile.TemporaryDirectory() as _d, chdir(synth_project(_d, modules=_n, exports=20)):
+            _p = read_project(cache=False)
+            _rows.append({
+                'modules':         _n,
+                'render llms':     internal_measure(lambda: Path('a.txt').write_text(render_llms_full(_p)), 1)['peak_kb'],
+                'stream llms':     internal_measure(lambda: build_docs(_p), 1)['peak_kb'],
+                'render page':     internal_measure(lambda: Path('a.html').write_text(render_page(_p)), 1)['peak_kb'],
+                'stream page':     internal_measure(lambda: write_stream(Path('b.html'), iter_page(_p)), 1)['peak_kb'],
+                'build_docs_html': internal_measure(lambda: build_docs_html(_p), 1)['peak_kb'],
+            })
+    _rows
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## Parse model memory
+    """)
+    return
+
+
+@app.function
+def internal_deep_size(
+    obj,        # root of an object graph
+    seen: set,  # ids already counted
+) -> int:       # bytes of everything reachable, each object once
+    "sys.getsizeof over containers, instance dicts and slotted dataclass fields."
+    if id(obj) in seen: return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return size + sum(internal_deep_size(k, seen) + internal_deep_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)): return size + sum(internal_deep_size(x, seen) for x in obj)
+    if not dataclasses.is_dataclass(obj): return size
+    if hasattr(obj, '__dict__'): return size + internal_deep_size(obj.__dict__, seen)
+    return size + sum(internal_deep_size(getattr(obj, f.name), seen) for f in dataclasses.fields(obj))
+
+
+@app.function
+def internal_dict_backed(
+    obj,          # parse-model object graph
+    twins: dict,  # slotted class → dict-backed twin, filled on demand
+):                # the same data in the old layout
+    """Copy as plain dict-backed dataclasses, with Param/Return strings copied
+    per field as the parser produced them before interning, and Export/Setup
+    source materialized as src (and clean_src) strings instead of a Span."""
+    if isinstance(obj, list): return [internal_dict_backed(x, twins) for x in obj]
+    if isinstance(obj, tuple): return tuple(internal_dict_backed(x, twins) for x in obj)
+    if not dataclasses.is_dataclass(obj): return obj
+    fields = {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    if 'source' in fields:
+        del fields['source']
+        fields['src'] = obj.src
+        if isinstance(obj, Export): fields['clean_src'] = obj.clean_src
+    copy = isinstance(obj, (Param, Return))
+    values = {k: (v + '.')[:-1] if copy and isinstance(v, str) and len(v) > 1 else internal_dict_backed(v, twins)
+              for k, v in fields.items()}
+    if type(obj) not in twins: twins[type(obj)] = dataclasses.make_dataclass(type(obj).__name__, list(values))
+    return twins[type(obj)](**values)
+
+
+@app.function
+def model_memory(
+    proj, # parsed project
+) -> dict: # {'exports': n, 'slots': bytes per export now, 'dict': bytes per export dict-backed}
+    "Bytes per export the modules hold, source text included, in both layouts."
+    n = sum(len(m.exports) for m in proj.modules) or 1
+    return {
+        'exports': n,
+        'slots':   round(internal_deep_size(proj.modules, set()) / n),
+        'dict':    round(internal_deep_size(internal_dict_backed(proj.modules, {}), set()) / n),
+    }
+
+
+@app.cell
+def _():
+    # Bytes per export: the dict-backed layout with src + clean_src copies, the slotted model with
+    # one buffer per export (default), and with source_spans (one shared buffer per notebook).
+    # Per-export figures barely move with project size; md bench reports them for any shape.
+    with tempfile.TemporaryDirectory() as _d, chdir(synth_project(_d, modules=5, exports=20)):
+        _m = model_memory(read_project(cache=False))
+        _m['source_spans'] = model_memory(read_project(cache=False, source_spans=True))['slots']
+    _m
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""
+    ## History
+    """)
+    return
+
+
+@app.function
+def record_bench(
+    history: str | Path,  # JSON file holding a list of runs
+    shape: dict,          # synth_project arguments the run used
+    stages: dict,         # from run_bench
+) -> tuple[dict, dict | None]: # (this run, previous run with the same shape or None)
+    "Append a run to the history file and return it with the last comparable run."
+    history = Path(history)
+    try: runs = json.loads(history.read_text())
+    except (OSError, ValueError): runs = []
+    try: version = metadata.version('marimo-dev')
+    except metadata.PackageNotFoundError: version = '0'
+    run = {
+        'version': version,
+        'python':  platform.python_version(),
+        'date':    datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'shape':   shape,
+        'stages':  stages,
+    }
+    prev = next((r for r in reversed(runs) if r.get('shape') == shape), None)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    history.write_text(json.dumps(runs + [run], indent=2) + '\n')
+    return run, prev
+
+
+@app.function
+def render_bench(
+    run: dict,         # this run, from record_bench
+    prev: dict | None, # previous comparable run or None
+) -> str:              # aligned text table
+    "Format a run as a table, with deltas against the previous run when there is one."
+    head = f"{'stage':<18}{'ms':>10}{'peak KB':>10}"
+    if prev: head += f"{'prev ms':>10}{'Δ':>8}   (prev: {prev['version']}, {prev['date']})"
+    lines = [head]
+    for name, cur in run['stages'].items():
+        line = f"{name:<18}{cur['ms']:>10.1f}{cur['peak_kb']:>10.1f}"
+        if prev and name in prev['stages']:
+            old = prev['stages'][name]['ms']
+            line += f"{old:>10.1f}{(cur['ms'] - old) / old * 100 if old else 0:>+7.0f}%"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+@app.function
+def bench(
+    history: str = '.marimo-dev/bench.json', # where runs accumulate
+    repeat: int = 3,                         # timed runs per stage
+    **shape,                                 # synth_project shape overrides
+) -> str:                                    # report table
+    "Generate a synthetic project in a temp dir, benchmark every stage, record and report."
+    shape = {**DEFAULT_SHAPE, **shape}
+    with tempfile.TemporaryDirectory() as d:
+        synth_project(d, **shape)
+        stages = run_bench(d, repeat)
+        with chdir(d):
+            mem = model_memory(read_project(cache=False))
+            spans = model_memory(read_project(cache=False, source_spans=True))
+    run, prev = record_bench(history, shape, stages)
+    return (f"{render_bench(run, prev)}\n\nparse model: {mem['slots']:,} bytes/export, "
+            f"{spans['slots']:,} with source_spans ({mem['dict']:,} dict-backed, uninterned, "
+            f"src + clean_src copies)\n\nAppended to {history}")
+
+
+if __name__ == "__main__":
+    app.run()
@@ -1,14 +1,122 @@
 """Build and publish (functional/immutable) python packages from marimo notebooks"""
 __version__ = '0.4.5'
 __author__ = 'Mike Deufel'
-from .types import rename, Config, Param, Return, Method, Import, Const, Setup, ExportKind, Export, ParsedFile, Module, Meta, Project
-from .parse import read_config, read_project
-from .build_pkg import build, bundle
-from .build_docs import render_llms, render_llms_full, build_docs
-from .publish import publish
-from .cli import tidy, nuke, main
-from .build_docs_html import signature_text, method_signature_text, render_export, render_module_setup, render_module_panel, render_tabs, render_sidebar, render_header, render_page, build_docs_html
+import importlib as _importlib
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .types import rename, Config, Param, Return, Method, Buffer, Span, Import, Const, Setup, ExportKind, Export, ParsedFile, Module, Meta, Project
+    from .parse import read_config, read_project, refresh_project
+    from .build_pkg import render_package, build, import_timings, resolve_line, build_pyz, bundle
+    from .build_docs import render_llms, iter_llms_full, render_llms_full, write_stream, compress_docs, drop_compressed, prune_docs, build_docs
+    from .publish import render_metadata, wheel_files, build_wheel, build_sdist, dist, publish
+    from .cli import tidy, nuke, main
+    from .build_docs_html import signature_text, method_signature_text, render_export, render_module_setup, render_module_panel, build_search_index, render_search, page_file, render_tabs, render_sidebar_list, render_sidebar, render_header, render_page, iter_page, build_docs_html
+    from .cache import ParseCache
+    from .watch import snapshot, watch_changes, refresh, watch
+    from .importtime import importtime, render_importtime, write_importtime
+    from .bench import synth_project, run_bench, model_memory, record_bench, render_bench, bench
+    from .profiling import Trace, span, start_profile, render_profile, write_profile
+    from .serve import request, serve
+
+_LAZY = {
+    'rename': 'types',
+    'Config': 'types',
+    'Param': 'types',
+    'Return': 'types',
+    'Method': 'types',
+    'Buffer': 'types',
+    'Span': 'types',
+    'Import': 'types',
+    'Const': 'types',
+    'Setup': 'types',
+    'ExportKind': 'types',
+    'Export': 'types',
+    'ParsedFile': 'types',
+    'Module': 'types',
+    'Meta': 'types',
+    'Project': 'types',
+    'read_config': 'parse',
+    'read_project': 'parse',
+    'refresh_project': 'parse',
+    'render_package': 'build_pkg',
+    'build': 'build_pkg',
+    'import_timings': 'build_pkg',
+    'resolve_line': 'build_pkg',
+    'build_pyz': 'build_pkg',
+    'bundle': 'build_pkg',
+    'render_llms': 'build_docs',
+    'iter_llms_full': 'build_docs',
+    'render_llms_full': 'build_docs',
+    'write_stream': 'build_docs',
+    'compress_docs': 'build_docs',
+    'drop_compressed': 'build_docs',
+    'prune_docs': 'build_docs',
+    'build_docs': 'build_docs',
+    'render_metadata': 'publish',
+    'wheel_files': 'publish',
+    'build_wheel': 'publish',
+    'build_sdist': 'publish',
+    'dist': 'publish',
+    'publish': 'publish',
+    'tidy': 'cli',
+    'nuke': 'cli',
+    'main': 'cli',
+    'signature_text': 'build_docs_html',
+    'method_signature_text': 'build_docs_html',
+    'render_export': 'build_docs_html',
+    'render_module_setup': 'build_docs_html',
+    'render_module_panel': 'build_docs_html',
+    'build_search_index': 'build_docs_html',
+    'render_search': 'build_docs_html',
+    'page_file': 'build_docs_html',
+    'render_tabs': 'build_docs_html',
+    'render_sidebar_list': 'build_docs_html',
+    'render_sidebar': 'build_docs_html',
+    'render_header': 'build_docs_html',
+    'render_page': 'build_docs_html',
+    'iter_page': 'build_docs_html',
+    'build_docs_html': 'build_docs_html',
+    'ParseCache': 'cache',
+    'snapshot': 'watch',
+    'watch_changes': 'watch',
+    'refresh': 'watch',
+    'watch': 'watch',
+    'importtime': 'importtime',
+    'render_importtime': 'importtime',
+    'write_importtime': 'importtime',
+    'synth_project': 'bench',
+    'run_bench': 'bench',
+    'model_memory': 'bench',
+    'record_bench': 'bench',
+    'render_bench': 'bench',
+    'bench': 'bench',
+    'Trace': 'profiling',
+    'span': 'profiling',
+    'start_profile': 'profiling',
+    'render_profile': 'profiling',
+    'write_profile': 'profiling',
+    'request': 'serve',
+    'serve': 'serve',
+}
+_SUBMODULES = {'types', 'parse', 'build_pkg', 'build_docs', 'publish', 'cli', 'build_docs_html', 'cache', 'watch', 'importtime', 'bench', 'profiling', 'serve'}
+
+
+def __getattr__(name):
+    "Import the module defining `name` on first access (PEP 562)."
+    if name in _LAZY:
+        value = getattr(_importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return _importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY.keys() | _SUBMODULES)
 __all__ = [
+    "Buffer",
     "Config",
     "Const",
     "Export",
@@ -18,30 +126,72 @@ __all__ = [
     "Method",
     "Module",
     "Param",
+    "ParseCache",
     "ParsedFile",
     "Project",
     "Return",
     "Setup",
+    "Span",
+    "Trace",
+    "bench",
     "build",
     "build_docs",
     "build_docs_html",
+    "build_pyz",
+    "build_sdist",
+    "build_search_index",
+    "build_wheel",
     "bundle",
+    "compress_docs",
+    "dist",
+    "drop_compressed",
+    "import_timings",
+    "importtime",
+    "iter_llms_full",
+    "iter_page",
     "main",
     "method_signature_text",
+    "model_memory",
     "nuke",
+    "page_file",
+    "prune_docs",
     "publish",
     "read_config",
     "read_project",
+    "record_bench",
+    "refresh",
+    "refresh_project",
     "rename",
+    "render_bench",
     "render_export",
     "render_header",
+    "render_importtime",
     "render_llms",
     "render_llms_full",
+    "render_metadata",
     "render_module_panel",
     "render_module_setup",
+    "render_package",
     "render_page",
+    "render_profile",
+    "render_search",
     "render_sidebar",
+    "render_sidebar_list",
     "render_tabs",
+    "request",
+    "resolve_line",
+    "run_bench",
+    "serve",
     "signature_text",
+    "snapshot",
+    "span",
+    "start_profile",
+    "synth_project",
     "tidy",
+    "watch",
+    "watch_changes",
+    "wheel_files",
+    "write_importtime",
+    "write_profile",
+    "write_stream",
 ]
@@ -1,18 +1,61 @@
+from dataclasses import replace
 from pathlib import Path
-import re, shutil, sys
-from .types import Project, Module
-
-def _apply_renames(
-    src: str,          # source code text
-    name: str,         # original function/class name
-    final_name: str,   # resolved name from parser
-) -> str:              # source with def/class name replaced
-    "Rename a function/class definition in source."
-    if final_name == name: return src
-    return re.sub(
-        rf'(?m)^(\s*(?:async\s+)?(?:def|class)\s+){re.escape(name)}\b',
-        rf'\g<1>{final_name}', src, count=1
-    )
+import ast, importlib.util, io, json, marshal, os, re, subprocess, sys, tempfile, time, tokenize, zipfile
+from .types import Project, Module, EXPORT_DECORATORS
+from .profiling import span
+
+STRING_OR_COMMENT = '(?P<skip>#[^\\n]*|(?<!\\w)[rRbBuUfF]{0,2}(?:\\\'\\\'\\\'(?:\\\\[\\s\\S]|[^\\\\])*?\\\'\\\'\\\'|"""(?:\\\\[\\s\\S]|[^\\\\])*?"""|\\\'(?:\\\\.|[^\\\'\\\\\\n])*\\\'|"(?:\\\\.|[^"\\\\\\n])*"))'
+
+def _fstring_fields(
+    text: str, # f-string literal, prefix and quotes included
+    sub,       # called with each top-level {replacement field}, returns its new text
+) -> str:      # text with every replacement field passed through sub
+    """Rewrite the code parts of an f-string, found by brace depth.
+
+    `{{` and `}}` at depth 0 are literal braces. A field ends at the brace
+    that closes its opening one, so nested format specs such as
+    `{f(x)!r:>{w}}` stay inside the field they belong to.
+    """
+    out, start, depth = [], 0, 0
+    for m in re.finditer(r'\{\{|\}\}|[{}]', text):
+        b = m.group()
+        if depth == 0 and len(b) == 2: continue
+        for c in b:
+            if c == '{':
+                if depth == 0: out.append(text[start:m.start()]); start = m.start()
+                depth += 1
+            elif depth:
+                depth -= 1
+                if depth == 0: out.append(sub(text[start:m.end()])); start = m.end()
+    out.append(text[start:])
+    return ''.join(out)
+
+def _rename_names(
+    src: str,                   # python source text
+    rename_map: dict[str, str], # original identifier → final identifier
+) -> str:                       # source with every renamed identifier rewritten
+    """Rewrite identifiers in one regex pass; strings and comments are left alone.
+
+    One alternation matches comments and string literals first, so the
+    names inside them are skipped, and the renamed names otherwise. Cost
+    is one C-level scan of the source whatever len(rename_map) is.
+    Inside f-strings only the {replacement fields} are code, so only
+    they are rewritten.
+    """
+    if not rename_map: return src
+    names = r'\b(?:' + '|'.join(sorted(map(re.escape, rename_map), key=len, reverse=True)) + r')\b'
+    if not re.search(names, src): return src
+    name_pat = re.compile(names)
+    # the lookahead lets the scan skip most positions on their first character
+    first = re.escape(''.join(sorted({n[0] for n in rename_map} | set('#\'"rRbBuUfF'))))
+    pat = re.compile(f'(?=[{first}])(?:' + STRING_OR_COMMENT + '|(?P<name>' + names + '))')
+    def repl(m):
+        text = m.group()
+        if m.lastgroup == 'name': return rename_map[text]
+        if text[0] != '#' and 'f' in text[:2].lower() and text[:1] not in '\'"':
+            return _fstring_fields(text, lambda f: name_pat.sub(lambda n: rename_map[n.group()], f))
+        return text
+    return pat.sub(repl, src)
 
 def _rewrite_import(
     src: str,              # import statement source
@@ -29,54 +72,132 @@ def _rewrite_import(
         return src.replace(f'from {module}', f'from .{stripped}')
     return src
 
-def _write(
-    path: Path,    # file path to write
+def _rewrite_local_imports(
+    src: str,              # export source (function and class definitions)
+    mod_names,             # module names in this project
+    drop: bool = False,    # bundle: remove them instead, the names are module globals there
+) -> str:                  # source with nested cross-notebook imports fixed, same line count
+    """Rewrite `from x_nb import ...` inside function bodies, e.g. deferred CLI imports.
+
+    Package modules get the relative form, as setup-cell imports do. In a
+    bundle every name is already global, so the statement becomes `pass`
+    (or `alias = name` for `import name as alias`) on the same lines.
+    """
+    if 'import' not in src: return src
+    try: tree = ast.parse(src)
+    except SyntaxError: return src
+    lines = src.split('\n')
+    for n in ast.walk(tree):
+        if not isinstance(n, ast.ImportFrom) or n.level or not n.col_offset: continue
+        stripped = re.sub(r'^[a-z]_', '', n.module or '')
+        if stripped not in mod_names: continue
+        i, line = n.lineno - 1, lines[n.lineno - 1]
+        if not drop:
+            lines[i] = line[:n.col_offset] + line[n.col_offset:].replace(f'from {n.module}', f'from .{stripped}', 1)
+            continue
+        binds = '; '.join(f'{a.asname} = {a.name}' for a in n.names if a.asname and a.asname != a.name)
+        end = line[n.end_col_offset:] if n.end_lineno == n.lineno else lines[n.end_lineno - 1][n.end_col_offset:]
+        lines[i] = line[:n.col_offset] + (binds or 'pass') + end
+        for j in range(n.lineno, n.end_lineno): lines[j] = ''
+    return '\n'.join(lines)
+
+def _join(
     *parts: str,   # content parts to join with blank lines
-):
-    "Write non-empty parts joined by blank lines."
-    path.write_text('\n\n'.join(p for p in parts if p and p.strip()) + '\n')
+) -> str:          # file text
+    "Join non-empty parts by blank lines, with a trailing newline."
+    return '\n\n'.join(p for p in parts if p and p.strip()) + '\n'
+
+def _write_if_changed(
+    path: Path, # file path to write
+    text: str,  # desired file content
+) -> bool:      # True if the file was created or rewritten
+    "Write text only if the bytes on disk differ, so unchanged files keep their mtime."
+    data = text.encode()
+    try:
+        if path.read_bytes() == data: return False
+    except FileNotFoundError:
+        pass
+    path.write_bytes(data)
+    return True
 
-def _write_module(
-    path: Path,            # output .py file path
+def _render_module(
     mod: Module,           # parsed module data
     mod_names: list[str],  # all module names for import rewriting
-):
-    "Write a single .py module file from a Module."
+) -> str:                  # .py file text
+    "Render a single .py module file from a Module."
     imports = '\n'.join(_rewrite_import(i.src, mod_names) for i in mod.imports)
     consts  = '\n'.join(c.src for c in mod.consts)
     setup   = '\n'.join(s.src for s in mod.setup)
 
-    exp_src = '\n\n'.join(
-        _apply_renames(e.clean_src, e.name, e.final_name) for e in mod.exports
+    # Rename definitions and cross-references to renamed symbols in one pass
+    exp_src = _rename_names(
+        _rewrite_local_imports('\n\n'.join(e.clean_src for e in mod.exports), mod_names),
+        mod.renames,
     )
 
-    # Fix cross-references to renamed symbols
-    rename_map = {
-        e.name: e.final_name
-        for e in mod.exports
-        if e.final_name != e.name
-    }
-    for old, new in rename_map.items():
-        exp_src = re.sub(rf'\b{re.escape(old)}\b', new, exp_src)
+    return _join(imports, consts, setup, exp_src)
+
+def _render_lazy(
+    imports: list[str],     # the eager "from .mod import a, b" lines
+    table: dict[str, str],  # public name → defining module
+) -> str:                   # PEP 562 block for __init__.py
+    """Render a module __getattr__/__dir__ that imports each module on first use.
+
+    The eager imports are kept under TYPE_CHECKING so type checkers and IDEs
+    still see every name; it is a plain False rather than typing's, so that
+    importing the package does not import typing. Submodules stay reachable
+    as attributes too.
+    """
+    entries = '\n'.join(f"    '{n}': '{m}'," for n, m in table.items())
+    checking = '\n'.join(f'    {i}' for i in imports)
+    submodules = ', '.join(f"'{m}'" for m in dict.fromkeys(table.values()))
+    return f'''import importlib as _importlib
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+{checking}
+
+_LAZY = {{
+{entries}
+}}
+_SUBMODULES = {{{submodules}}}
 
-    _write(path, imports, consts, setup, exp_src)
 
-def _write_init(
-    path: Path,     # path to write __init__.py
+def __getattr__(name):
+    "Import the module defining `name` on first access (PEP 562)."
+    if name in _LAZY:
+        value = getattr(_importlib.import_module(f'.{{_LAZY[name]}}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return _importlib.import_module(f'.{{name}}', __name__)
+    raise AttributeError(f"module {{__name__!r}} has no attribute {{name!r}}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY.keys() | _SUBMODULES)'''
+
+def _render_init(
     proj: Project,  # complete parsed project
-):
+) -> str:           # __init__.py text
     "Generate __init__.py with metadata and re-exports."
     meta = proj.meta
     lines = [f'"""{meta.desc}"""', f"__version__ = '{meta.version}'"]
     if meta.author:
         lines.append(f"__author__ = '{meta.author.split('<')[0].strip()}'")
 
-    all_exports = []
+    imports, table = [], {}
     for mod in proj.modules:
         pub = [e.final_name for e in mod.public_exports]
         if pub:
-            lines.append(f"from .{mod.name} import {', '.join(pub)}")
-            all_exports.extend(pub)
+            imports.append(f"from .{mod.name} import {', '.join(pub)}")
+            table.update(dict.fromkeys(pub, mod.name))
+    all_exports = list(table)
+
+    if proj.config.lazy_init and table:
+        lines.append(_render_lazy(imports, table))
+    else:
+        lines.extend(imports)
 
     if all_exports:
         entries = '\n'.join(f'    "{n}",' for n in sorted(all_exports))
@@ -88,20 +209,21 @@ def _write_init(
     if proj.init_extras.setup:
         lines.append('\n'.join(s.src for s in proj.init_extras.setup))
 
-    _write(path, '\n'.join(lines))
+    return _join('\n'.join(lines))
 
-def _write_main(
-    path: Path,                            # path to write __main__.py
+def _render_main(
     app_parts: tuple[str, str, str|None],  # (module, object, optional runner)
-):
+    package: str = '',                     # import the module from this package instead of relatively
+) -> str:                                  # __main__.py text
     "Generate __main__.py entry point for application mode."
     mod, obj, runner = app_parts
+    mod = f"{package}.{mod}" if package else f".{mod}"
     if runner:
         pkg, func = runner.rsplit('.', 1)
-        code = f"from .{mod} import {obj}\nfrom {pkg} import {func}\n{func}({obj})\n"
+        code = f"from {mod} import {obj}\nfrom {pkg} import {func}\n{func}({obj})\n"
     else:
-        code = f"from .{mod} import {obj}\n{obj}()\n"
-    path.write_text(code)
+        code = f"from {mod} import {obj}\n{obj}()\n"
+    return code
 
 def _entry_point_src(
     app_parts: tuple[str, str, str|None], # (module, object, optional runner)
@@ -114,87 +236,323 @@ def _entry_point_src(
     else:
         return f"\n{obj}()\n"
 
+def _shake(
+    proj: Project,     # complete parsed project
+    roots: list[str],  # names the bundle must define, original or final
+    local: set[str],   # src of setup imports between notebooks (never emitted)
+) -> set[int]:         # id() of every Export, Const, Setup and Import to keep
+    """Reachability over names: keep what the roots read, transitively.
+
+    Setup statements that bind nothing run for their side effects and star
+    imports bind unknown names, so both are always kept. A setup statement
+    is also kept once anything it reads is reached, since it may mutate
+    it (`for k in ks: REGISTRY.append(k)` binds only `k`).
+    """
+    defs, users, keep, todo = {}, {}, set(), []
+    for m in proj.modules:
+        for e in m.exports: defs.setdefault(e.name, []).append((e, e.refs))
+        for c in m.consts:  defs.setdefault(c.name, []).append((c, c.refs))
+        for st in m.setup:
+            for n in st.defines: defs.setdefault(n, []).append((st, st.refs))
+            for n in set(st.refs) - set(st.defines): users.setdefault(n, []).append((st, st.refs))
+            if not st.defines:
+                keep.add(id(st))
+                todo += st.refs
+        for i in m.imports:
+            if i.src in local: continue
+            if '*' in i.names: keep.add(id(i))
+            for n in i.names: defs.setdefault(n, []).append((i, ()))
+    symbols = proj.symbols
+    todo += [symbols[r][1].name if r in symbols else r for r in roots]
+    seen = set()
+    while todo:
+        name = todo.pop()
+        if name in seen: continue
+        seen.add(name)
+        # users only of names the bundle defines, not of builtins such as range
+        for node, refs in (*defs.get(name, ()), *(users.get(name, ()) if name in defs else ())):
+            if id(node) not in keep:
+                keep.add(id(node))
+                todo += refs
+    return keep
+
+def render_package(
+    proj: Project,     # complete parsed project
+    only: set[str] | None = None, # module names to render, None for all
+) -> dict[str, str]:   # filename → file text, for every file build() owns
+    "Render every package file (or only some modules plus __init__/__main__) in memory without touching disk."
+    mod_names, files = proj.mod_names, {}
+    for mod in proj.modules:
+        if mod.name != 'index' and mod.has_exports and (only is None or mod.name in only):
+            with span('render', module=mod.name): files[f'{mod.name}.py'] = _render_module(mod, mod_names)
+    with span('render', module='__init__'): files['__init__.py'] = _render_init(proj)
+    if proj.config.app_parts:
+        files['__main__.py'] = _render_main(proj.config.app_parts)
+    return files
+
 def build(
     proj: Project, # complete parsed project
+    only: set[str] | None = None, # module names to rerender (e.g. proj.dependents(changed)), None for all
 ) -> str:          # path to built package directory
-    "Build a Python package from a parsed Project."
+    """Build a Python package from a parsed Project.
+
+    Incremental: files whose rendered bytes match disk are left untouched,
+    and only .py files no longer produced by any notebook are deleted.
+    With `only`, other modules' files are not rendered at all; the module
+    set must be unchanged since the last full build, and if any other
+    module's file is missing from disk (md nuke, rm -rf) everything is
+    rendered after all.
+    Prints which files were written or removed.
+    """
     cfg, meta = proj.config, proj.meta
     pkg = Path(cfg.root) / cfg.out / meta.pkg_name
-    if pkg.exists(): shutil.rmtree(pkg)
     pkg.mkdir(parents=True, exist_ok=True)
+    if only is not None and any(not (pkg / f'{m.name}.py').exists() for m in proj.modules
+                                if m.name != 'index' and m.has_exports and m.name not in only):
+        only = None
 
-    mod_names = proj.mod_names
-    for mod in proj.modules:
-        if mod.name != 'index' and mod.has_exports:
-            _write_module(pkg / f'{mod.name}.py', mod, mod_names)
-
-    _write_init(pkg / '__init__.py', proj)
-    if cfg.app_parts:
-        _write_main(pkg / '__main__.py', cfg.app_parts)
+    files = render_package(proj, only)
+    with span('write', files=len(files)):
+        wrote = [n for n, text in files.items() if _write_if_changed(pkg / n, text)]
+        removed = [p.name for p in sorted(pkg.glob('*.py')) if p.name not in files] if only is None else []
+        for n in removed: (pkg / n).unlink()
 
+    if wrote:   print(f"Wrote {len(wrote)}/{len(files)}: {', '.join(wrote)}")
+    if removed: print(f"Removed: {', '.join(removed)}")
+    if not (wrote or removed): print("Package up to date")
     return str(pkg)
 
+def _import_ms(
+    parent: Path,  # directory containing the package
+    name: str,     # package to import
+    runs: int = 5, # fresh interpreters to try; the fastest wins
+) -> float:        # milliseconds spent inside `import name`
+    """Time a cold `import name` in fresh interpreters, excluding interpreter startup.
+
+    The child reports on a tagged last line of stderr, so a package that
+    prints on import does not matter. Raises ImportError with the child's
+    last error line when the import fails.
+    """
+    tag = 'md-import-s '
+    code = (f'import sys, time; t = time.perf_counter(); import {name}; '
+            f'sys.stderr.write("\\n{tag}%r\\n" % (time.perf_counter() - t))')
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(parent), os.environ.get('PYTHONPATH')]))}
+    best = float('inf')
+    for _ in range(runs):
+        r = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        last = r.stderr.rstrip('\n').rpartition('\n')[2]
+        if r.returncode or not last.startswith(tag):
+            raise ImportError(f"import {name} failed: {last or f'exit code {r.returncode}'}")
+        best = min(best, float(last[len(tag):]))
+    return 1e3 * best
+
+def import_timings(
+    proj: Project,      # complete parsed project
+) -> dict[str, float]:  # {'eager': ms, 'lazy': ms} for a cold `import pkg`
+    "Render eager and lazy __init__ variants into temp dirs and time a cold import of each."
+    out = {}
+    for mode in ('eager', 'lazy'):
+        variant = replace(proj, config=replace(proj.config, lazy_init=mode == 'lazy'))
+        with tempfile.TemporaryDirectory() as d:
+            pkg = Path(d) / proj.meta.pkg_name
+            pkg.mkdir()
+            for n, text in render_package(variant).items(): (pkg / n).write_text(text)
+            out[mode] = _import_ms(Path(d), proj.meta.pkg_name)
+    return out
+
+def _strip_docs(
+    src: str, # Python source
+) -> str:     # same source without comments and docstrings, line for line
+    """Blank out comments and docstrings without moving any other line.
+
+    A docstring becomes `...` on its first line and empty lines after, so
+    bodies stay valid and tracebacks keep their line numbers. Source that
+    does not parse on its own, or a docstring sharing a line with other
+    code, is left alone.
+    """
+    try: tree = ast.parse(src)
+    except SyntaxError: return src
+    lines = src.split('\n')
+    for tok in tokenize.generate_tokens(io.StringIO(src).readline):
+        if tok.type == tokenize.COMMENT:
+            r, c = tok.start
+            lines[r - 1] = lines[r - 1][:c].rstrip()
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)): continue
+        doc = node.body[0] if node.body else None
+        if not (isinstance(doc, ast.Expr) and isinstance(doc.value, ast.Constant)
+                and isinstance(doc.value.value, str)): continue
+        first, last = lines[doc.lineno - 1].encode(), lines[doc.end_lineno - 1].encode()
+        if first[:doc.col_offset].strip() or last[doc.end_col_offset:].strip(): continue
+        lines[doc.lineno - 1] = first[:doc.col_offset].decode() + '...'
+        for i in range(doc.lineno, doc.end_lineno): lines[i] = ''
+    return '\n'.join(lines)
+
+def _line_map(
+    proj: Project,   # complete parsed project
+    exports: list,   # exports in bundle order
+    start: int,      # bundle line of the first export
+) -> dict:           # {'sources': [notebook paths], 'exports': [[first bundle line, source index, [notebook lines]]]}
+    "Bundle line → notebook line for every export; stripping and renames keep lines, clean_src drops decorator lines."
+    owner = {id(e): m for m in proj.modules for e in m.exports}
+    sources, segments, line = [], [], start
+    strip = tuple(f'@{d}' for d in EXPORT_DECORATORS)
+    for e in exports:
+        src_lines = e.src.split('\n')
+        at_def = next((i for i, l in enumerate(src_lines)
+                       if re.match(r'\s*(async\s+def|def|class)\s', l)), 0)
+        first = e.lineno - at_def
+        nb = str(Path(proj.config.nbs) / f'{owner[id(e)].nb_stem}.py')
+        if nb not in sources: sources.append(nb)
+        kept_lines = [first + i for i, l in enumerate(src_lines) if not l.strip().startswith(strip)]
+        segments.append([line, sources.index(nb), kept_lines])
+        line += len(kept_lines) + 1
+    return {'sources': sources, 'exports': segments}
+
+def resolve_line(
+    map_path: str | Path, # {bundle}.map.json written by bundle(optimize=True)
+    line: int,            # line number from a traceback in the bundle
+) -> tuple[str, int] | None: # (notebook path, line) or None outside any export
+    "Map a bundle line back to the notebook line it came from."
+    m = json.loads(Path(map_path).read_text())
+    for first, src, lines in m['exports']:
+        if first <= line < first + len(lines): return m['sources'][src], lines[line - first]
+    return None
+
+def _compile_ms(
+    src: str, # Python source
+) -> float:   # best of 5 compile() times in milliseconds
+    "How long the interpreter needs to compile src, which a script pays on every launch."
+    best = float('inf')
+    for _ in range(5):
+        t = time.perf_counter()
+        compile(src, '<bundle>', 'exec', dont_inherit=True)
+        best = min(best, time.perf_counter() - t)
+    return best * 1e3
+
+def _pyc(
+    src: str,  # module source
+    path: str, # file name recorded in the code object (tracebacks)
+) -> bytes:    # .pyc contents for the running interpreter
+    "Compile to an unchecked hash-based pyc (PEP 552): no mtime, trusted without rereading the source."
+    data = src.encode()
+    code = compile(data, path, 'exec', dont_inherit=True)
+    flags = (0b01).to_bytes(4, 'little')  # hash-based, check_source off
+    return importlib.util.MAGIC_NUMBER + flags + importlib.util.source_hash(data) + marshal.dumps(code)
+
+def build_pyz(
+    proj: Project,           # complete parsed project
+    name: str | None = None, # output filename, defaults to {pkg_name}.pyz
+) -> str:                    # path to the .pyz
+    """Package the built modules as an executable zipapp with precompiled bytecode.
+
+    Each module ships as .py plus a sibling .pyc; zipimport prefers the .pyc
+    when its magic number matches, so launches skip compilation. The pycs and
+    the shebang target the interpreter running md; any other version falls
+    back to the sources. Third-party dependencies are not included.
+    """
+    cfg, pkg = proj.config, proj.meta.pkg_name
+    if not cfg.app_parts: raise ValueError("a .pyz needs an entry point: set application in [tool.marimo-dev]")
+    files = {f'{pkg}/{n}': text for n, text in render_package(proj).items()}
+    files['__main__.py'] = _render_main(cfg.app_parts, package=pkg)
+
+    buf = io.BytesIO()
+    buf.write(f'#!/usr/bin/env python{sys.version_info.major}.{sys.version_info.minor}\n'.encode())
+    with zipfile.ZipFile(buf, 'w') as z:
+        for n in sorted(files):
+            for arc, data in ((n, files[n].encode()), (n + 'c', _pyc(files[n], n))):
+                info = zipfile.ZipInfo(arc, date_time=(1980, 1, 1, 0, 0, 0))
+                info.external_attr = 0o644 << 16
+                z.writestr(info, data)
+
+    out = Path(cfg.root) / (name or f'{pkg}.pyz')
+    data = buf.getvalue()
+    if not out.exists() or out.read_bytes() != data:
+        out.write_bytes(data)
+    out.chmod(0o755)
+    print(f"Wrote {out}: {len(files) - 1} modules, {len(data):,} bytes")
+    return str(out)
+
 def bundle(
     proj: Project,           # complete parsed project
     name: str | None = None, # output filename (None for default)
+    shake: bool = False,     # keep only what the roots reach
+    roots: list[str] | None = None, # extra names to keep with shake, besides the entry point
+    optimize: bool = False,  # strip docstrings and comments, write {name}.map.json
 ) -> str:                    # path to bundled file
-    "Bundle all modules into a single Python file with PEP 723 deps."
+    """Bundle all modules into a single Python file with PEP 723 deps.
+
+    With shake, exports, consts, setup and imports that the entry point (or
+    roots) never reaches are left out, and so are their dependencies.
+    With optimize, docstrings and comments are blanked line for line and a
+    line map from bundle lines to notebook lines is written next to it.
+    """
     cfg, meta = proj.config, proj.meta
     mod_names = set(proj.mod_names)
 
-    # Collect external imports, deduplicate
-    seen_imports: set[str] = set()
-    external_imports: list[str] = []
-    dep_modules: set[str] = set()
+    # Classify imports: local (between notebooks) vs external with a dependency
+    local: set[str] = set()
+    deps: dict[str, set[str]] = {}
 
     for mod in proj.modules:
         for imp in mod.imports:
-            is_local = False
             if imp.src.startswith('from '):
                 parts = imp.src.split()
                 if len(parts) >= 2:
                     root_mod = re.sub(r'^[a-z]_', '', parts[1]).split('.')[0]
-                    if root_mod in mod_names: is_local = True
+                    if root_mod in mod_names: local.add(imp.src)
                     elif parts[1].split('.')[0] not in sys.stdlib_module_names:
-                        dep_modules.add(parts[1].split('.')[0])
+                        deps[imp.src] = {parts[1].split('.')[0]}
             elif imp.src.startswith('import '):
-                parts = imp.src.split()
-                if len(parts) >= 2:
-                    root_mod = parts[1].split('.')[0]
-                    if root_mod not in sys.stdlib_module_names:
-                        dep_modules.add(root_mod)
+                mods = {p.split(' as ')[0].strip().split('.')[0] for p in imp.src[len('import '):].split(',')}
+                deps[imp.src] = mods - set(sys.stdlib_module_names)
 
-            if not is_local and imp.src not in seen_imports:
-                seen_imports.add(imp.src)
-                external_imports.append(imp.src)
+    keep = None
+    if shake:
+        roots = list(roots or [])
+        if cfg.app_parts:
+            _, obj, runner = cfg.app_parts
+            roots += [obj] + ([runner.rsplit('.', 1)[-1]] if runner else [])
+        if not roots: raise ValueError("shake needs an application entry point or explicit roots")
+        keep = _shake(proj, roots, local)
+    kept = lambda nodes: [n for n in nodes if keep is None or id(n) in keep]
+
+    # Definitions in dependency order, so each module's names exist before its importers run
+    modules = proj.topo_modules()
+
+    # External imports still needed, deduplicated
+    external_imports = list(dict.fromkeys(
+        i.src for m in modules for i in kept(m.imports) if i.src not in local))
+    dep_modules = {d for i in external_imports for d in deps.get(i, ())}
 
     # PEP 723 header
     deps_str = ', '.join(f'"{d}"' for d in sorted(dep_modules))
     header = f'# /// script\n# dependencies = [{deps_str}]\n# ///'
 
     imports = '\n'.join(external_imports)
-    consts  = '\n'.join(c.src for m in proj.modules for c in m.consts)
-    setup   = '\n'.join(s.src for m in proj.modules for s in m.setup)
-
-    # Apply renames to exports and fix cross-references
-    exports = '\n\n'.join(
-        _apply_renames(e.clean_src, e.name, e.final_name)
-        for m in proj.modules for e in m.exports
-    )
-    rename_map = {
-        e.name: e.final_name
-        for m in proj.modules for e in m.exports
-        if e.final_name != e.name
-    }
-    for old, new in rename_map.items():
-        exports = re.sub(rf'\b{re.escape(old)}\b', new, exports)
-
-    sections = [header, imports, consts, setup, exports]
+    consts  = '\n'.join(c.src for m in modules for c in kept(m.consts))
+    setup   = '\n'.join(s.src for m in modules for s in kept(m.setup))
+    shipped = kept([e for m in modules for e in m.exports])
+    if keep is not None:
+        n_all = sum(len(m.exports) + len(m.consts) + len(m.setup) for m in proj.modules)
+        n_kept = sum(len(kept(m.exports)) + len(kept(m.consts)) + len(kept(m.setup)) for m in proj.modules)
+        print(f"Shaken: kept {n_kept}/{n_all} definitions, {len(external_imports)} imports")
 
-    if cfg.app_parts:
-        sections.append(_entry_point_src(cfg.app_parts))
+    def assemble(strip):
+        # Apply renames to exports and fix cross-references
+        exports = _rename_names(
+            _rewrite_local_imports('\n\n'.join(strip(e.clean_src) for e in shipped), mod_names, drop=True),
+            proj.renames,
+        )
+        sections = [header, imports, strip(consts), strip(setup)]
+        before = '\n\n'.join(p for p in sections if p.strip())
+        sections.append(exports)
+        if cfg.app_parts:
+            sections.append(_entry_point_src(cfg.app_parts))
+        # 1-based bundle line of the first export
+        return '\n\n'.join(p for p in sections if p.strip()), before.count('\n') + 3 if before else 1
 
-    content = '\n\n'.join(p for p in sections if p.strip())
+    content, start = assemble(_strip_docs if optimize else (lambda src: src))
 
     if name:
         out = Path(cfg.root) / name
@@ -202,5 +560,12 @@ def bundle(
         out = Path(cfg.root) / cfg.out / meta.pkg_name / '__init__.py'
 
     out.parent.mkdir(parents=True, exist_ok=True)
-    out.write_text(content)
+    _write_if_changed(out, content)
+
+    if optimize:
+        line_map = _line_map(proj, shipped, start)
+        _write_if_changed(out.with_name(out.name + '.map.json'), json.dumps(line_map) + '\n')
+        full, _ = assemble(lambda src: src)
+        print(f"Optimized: {len(full.encode()):,} → {len(content.encode()):,} bytes, "
+              f"compile {_compile_ms(full):.1f} → {_compile_ms(content):.1f} ms")
     return str(out)
@@ -1,55 +1,262 @@
-import sys, shutil
-from pathlib import Path
-from .parse import read_project
-from .build_pkg import build, bundle
-from .build_docs import build_docs
-from .publish import publish
-from .build_docs_html import build_docs_html
-
-def tidy():
+import os, sys
+
+USAGE = 'Usage: md [build|docs|bundle|dist|publish|watch|serve|importtime|bench|tidy|nuke] [--no-cache] [-j N] [--profile[=cprofile]] [--dry-run]'
+VALUE_FLAGS = ('-j',)
+TIDY_DIRS = ('__pycache__', '__marimo__', '.pytest_cache')
+TIDY_SUFFIXES = ('.pyc',)
+SERVED = ('build', 'docs', 'bundle', 'dist')
+
+def _ignore_rules(
+    d: str,       # directory that may hold a .gitignore
+    rel: str,     # d relative to the walk root, '' for the root
+) -> list[tuple]: # (base, pattern, anchored, negate) per rule, in file order
+    "Parse a .gitignore into rules matched against directory paths."
+    try:
+        with open(os.path.join(d, '.gitignore')) as f: lines = f.read().splitlines()
+    except OSError: return []
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        negate = line.startswith('!')
+        pat = line.lstrip('!').rstrip('/')
+        anchored = '/' in pat
+        rules.append((rel, pat.lstrip('/'), anchored, negate))
+    return rules
+
+def _ignored(
+    rel: str,     # directory path relative to the walk root, '/'-separated
+    rules: list,  # accumulated _ignore_rules, outermost first
+) -> bool:        # the last matching rule ignores it
+    "gitignore matching for a directory: basename patterns anywhere, slashed patterns from their file."
+    from fnmatch import fnmatch
+    ignored, name = False, rel.rpartition('/')[2]
+    for base, pat, anchored, negate in rules:
+        if base and not rel.startswith(base + '/'): continue
+        if fnmatch(rel[len(base) + 1:] if base else rel, pat) if anchored else fnmatch(name, pat):
+            ignored = not negate
+    return ignored
+
+def _tidy_targets(
+    root: str = '.', # directory to clean
+) -> list[str]:      # cache directories and stray .pyc files to remove
+    "Single pruned walk collecting everything tidy removes."
+    targets, stack = [], [(root, '', _ignore_rules(root, ''))]
+    while stack:
+        d, rel, rules = stack.pop()
+        with os.scandir(d) as it:
+            for e in it:
+                sub = f'{rel}/{e.name}' if rel else e.name
+                if not e.is_dir(follow_symlinks=False):
+                    if e.name.endswith(TIDY_SUFFIXES): targets.append(e.path)
+                elif e.name in TIDY_DIRS: targets.append(e.path)
+                elif e.name == '.git' or os.path.exists(os.path.join(e.path, 'pyvenv.cfg')): continue
+                elif not _ignored(sub, rules):
+                    stack.append((e.path, sub, rules + _ignore_rules(e.path, sub)))
+    cache = os.path.join(root, '.marimo-dev', 'cache')
+    if os.path.isdir(cache): targets.append(cache)
+    return targets
+
+def _reclaim(
+    path: str,      # file or directory to remove
+    dry_run: bool,  # only measure
+) -> tuple[int, int]: # (files, bytes) it held
+    "Size a path, then delete it unless dry_run."
+    import shutil
+    files = size = 0
+    if os.path.isdir(path):
+        stack = [path]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False): stack.append(e.path)
+                    else: files, size = files + 1, size + e.stat(follow_symlinks=False).st_size
+        if not dry_run: shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            files, size = 1, os.lstat(path).st_size
+            if not dry_run: os.unlink(path)
+        except OSError: return 0, 0
+    return files, size
+
+def tidy(
+    root: str = '.',       # directory to clean
+    dry_run: bool = False, # list what would go, delete nothing
+) -> tuple[int, int]:      # (files, bytes) reclaimed
     "Remove cache and temporary files."
-    for pattern in ('__pycache__', '__marimo__', '.pytest_cache'):
-        for p in Path('.').rglob(pattern): shutil.rmtree(p, ignore_errors=True)
-    for p in Path('.').rglob('*.pyc'): p.unlink(missing_ok=True)
-    print("Cleaned cache files")
+    from concurrent.futures import ThreadPoolExecutor
+    targets = _tidy_targets(root)
+    with ThreadPoolExecutor() as pool:
+        sizes = list(pool.map(_reclaim, targets, [dry_run] * len(targets)))
+    files, size = sum(f for f, _ in sizes), sum(b for _, b in sizes)
+    if dry_run: print(*sorted(targets), sep='\n')
+    print(f"{'Would remove' if dry_run else 'Removed'} {len(targets):,} paths, "
+          f"{files:,} files, {size / 1024:,.1f} KB")
+    return files, size
 
 def nuke():
     "Remove all build artifacts and cache files."
+    import shutil
     tidy()
     for d in ('dist', 'docs', 'src', 'temp'):
         shutil.rmtree(d, ignore_errors=True)
     print("Nuked build artifacts")
 
+def _split_args(
+    argv: list[str],                   # arguments after the command name
+) -> tuple[list[str], dict[str, str]]: # (positional args, {flag: value})
+    "Split argv into positionals and flags. Accepts '-j 4', '-j4' and '--flag=value'."
+    args, opts, it = [], {}, iter(argv)
+    for a in it:
+        if not a.startswith('-'): args.append(a)
+        elif a in VALUE_FLAGS: opts[a] = next(it, '')
+        elif a[:2] in VALUE_FLAGS: opts[a[:2]] = a[2:]
+        else:
+            k, _, v = a.partition('=')
+            opts[k] = v
+    return args, opts
+
 def main():
-    "Entry point for the md command."
+    """Entry point for the md command.
+
+    --profile records phase spans to .marimo-dev/profile.json and prints a
+    summary; --profile=cprofile also dumps cProfile stats next to it.
+    """
     if len(sys.argv) < 2:
-        print("Usage: md [build|docs|bundle|publish|tidy|nuke]")
+        print(USAGE)
         sys.exit(1)
 
     cmd = sys.argv[1]
+    args, opts = _split_args(sys.argv[2:])
+    # A running `md serve` answers build/docs/bundle/dist unless the call needs a fresh parse or profile
+    if cmd in SERVED and not {'--profile', '--no-cache', '-j'} & opts.keys():
+        from .serve import request
+        if reply := request(sys.argv[1:]):
+            out, code = reply
+            print(out, end='')
+            if code: sys.exit(code)
+            return
+    if '--profile' not in opts: return _dispatch(cmd, args, opts)
+
+    from .profiling import span, start_profile, write_profile
+    trace = start_profile(cprofile=opts['--profile'] == 'cprofile')
+    try:
+        with span(f'md {cmd}'): _dispatch(cmd, args, opts)
+    finally:
+        print(write_profile(trace))
 
-    if cmd == 'tidy':  tidy(); return
+def _dispatch(
+    cmd: str,               # command name, e.g. 'build'
+    args: list[str],        # positional arguments after it
+    opts: dict[str, str],   # flags from _split_args
+):
+    "Run one md command, reading the project first when it needs one."
+    if cmd == 'tidy':  tidy(dry_run='--dry-run' in opts); return
     if cmd == 'nuke':  nuke(); return
+    if cmd == 'bench':
+        from .bench import bench
+        shape = {k: int(opts[f'--{k}']) for k in ('modules', 'exports', 'params', 'setup') if f'--{k}' in opts}
+        if '--no-renames' in opts: shape['renames'] = False
+        print(bench(repeat=int(opts.get('--repeat') or 3), **shape)); return
 
     # Everything else needs the project
-    proj = read_project()
+    overrides = _overrides(opts)
+    if cmd == 'watch':
+        from .watch import watch
+        watch(html='--html' in opts, **overrides); return
+    if cmd == 'serve':
+        from .serve import request, serve
+        if '--stop' not in opts: serve(_served, daemon='--daemon' in opts, **overrides)
+        else: print(reply[0] if (reply := request(['stop'])) else "md serve is not running")
+        return
+
+    from .parse import read_project
+    from .profiling import span
+    try:
+        with span('read_project'): proj = read_project(**overrides)
+    except ExceptionGroup as eg:
+        print(eg.message)
+        for e in eg.exceptions:
+            print(f"  {type(e).__name__}: {e}", *getattr(e, '__notes__', ()), sep='\n    ')
+        sys.exit(1)
+    _command(proj, cmd, args, opts)
 
-    
+def _overrides(
+    opts: dict[str, str], # flags from _split_args
+) -> dict:                # Config overrides for read_project
+    "Config fields set by command-line flags."
+    overrides = {}
+    if '--no-cache' in opts: overrides['cache'] = False
+    if '-j' in opts:
+        if not (opts['-j'] or '0').isdecimal():
+            print(f"-j expects a number of processes (0 = one per CPU), got {opts['-j']!r}")
+            print(USAGE)
+            sys.exit(1)
+        overrides['jobs'] = int(opts['-j'] or 0)
+    if '--split' in opts: overrides['docs_split'] = True
+    if '--compress' in opts: overrides['compress'] = True
+    return overrides
+
+def _served(
+    proj: 'Project',              # the daemon's current project
+    argv: list[str],            # client arguments, e.g. ['docs', '--split']
+    only: set[str] | None,      # modules changed since the last build, None for all
+):
+    "Run a client's command in the daemon, with its flags applied to the held Config."
+    from dataclasses import replace
+    args, opts = _split_args(argv[1:])
+    if overrides := _overrides(opts): proj = replace(proj, config=replace(proj.config, **overrides))
+    _command(proj, argv[0], args, opts, only)
+
+def _command(
+    proj: 'Project',              # complete parsed project
+    cmd: str,                   # command name, e.g. 'build'
+    args: list[str],            # positional arguments after it
+    opts: dict[str, str],       # flags from _split_args
+    only: set[str] | None = None, # modules to rerender on build, None for all
+):
+    "Run one project command, importing only the modules it uses."
+    from .profiling import span
     if cmd == 'build':
-        pkg = build(proj)
-        build_docs(proj)
+        from .build_pkg import build
+        from .build_docs import build_docs
+        with span('build'): pkg = build(proj, only)
+        with span('build_docs'): build_docs(proj)
         print(f"Built package at: {pkg}")
+        if '--timings' in opts:
+            from .build_pkg import import_timings
+            try: t = import_timings(proj)
+            except ImportError as e: print(f"No import timings: {e}")
+            else: print(f"import {proj.meta.pkg_name}: eager {t['eager']:.1f} ms, lazy {t['lazy']:.1f} ms")
 
     elif cmd == 'docs':
-        print(build_docs(proj))
-        print(build_docs_html(proj))
+        from .build_docs import build_docs
+        from .build_docs_html import build_docs_html
+        with span('build_docs'): print(build_docs(proj))
+        with span('build_docs_html'): print(build_docs_html(proj))
 
     elif cmd == 'bundle':
-        name = sys.argv[2] if len(sys.argv) > 2 else None
-        print(bundle(proj, name=name))
+        from .build_pkg import build_pyz, bundle
+        name = args[0] if args else None
+        roots = opts['--roots'].split(',') if opts.get('--roots') else None
+        try:
+            if name and name.endswith('.pyz'): print(build_pyz(proj, name))
+            else: print(bundle(proj, name=name, shake='--shake' in opts or roots is not None, roots=roots,
+                               optimize='--optimize' in opts))
+        except ValueError as e:  # includes graphlib.CycleError from topo_modules
+            sys.exit(f"md bundle: {e.args[0]}")
+
+    elif cmd == 'dist':
+        from .publish import dist
+        dist(proj)
+
+    elif cmd == 'importtime':
+        from .importtime import write_importtime
+        print(write_importtime(proj, opts.get('--json', '')))
 
     elif cmd == 'publish':
-        test = '--test' in sys.argv or '-t' in sys.argv
+        from .publish import publish
+        test = '--test' in opts or '-t' in opts
         target = "TestPyPI" if test else "PyPI"
         if input(f"Publish to {target}? [y/N] ").lower() != 'y':
             print("Aborted"); sys.exit(0)
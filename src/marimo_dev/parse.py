@@ -1,6 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
 from pathlib import Path
-import ast, re, tomllib
-from .types import Config, Meta, Project, Module, Import, Const, Setup, Export, ParsedFile, Param, Method, Return, ExportKind, EXPORT_DECORATORS, rename
+import ast, io, os, re, sys, tokenize, tomllib
+from .types import Config, Meta, Project, Module, Import, Const, Setup, Export, ParsedFile, Buffer, Span, Param, Method, Return, ExportKind, EXPORT_DECORATORS, rename
+from .cache import ParseCache
+from .profiling import span
 
 def read_config(
     root: str = '.', # project root containing pyproject.toml
@@ -21,8 +25,11 @@ def _read_meta(
     with open(Path(root) / 'pyproject.toml', 'rb') as f:
         p = tomllib.load(f).get('project', {})
     a = (p.get('authors') or [{}])[0]
-    author = f"{a.get('name','')} <{a.get('email','')}>".strip(' <>') if isinstance(a, dict) else str(a)
+    if isinstance(a, dict):
+        author = f"{a.get('name','')} <{a['email']}>".strip() if a.get('email') else a.get('name', '')
+    else: author = str(a)
     lic = p.get('license', {})
+    readme = p.get('readme', '')
     return Meta(
         name    = p.get('name', ''),
         version = p.get('version', '0.0.0'),
@@ -30,98 +37,165 @@ def _read_meta(
         license = lic.get('text', '') if isinstance(lic, dict) else lic,
         author  = author,
         urls    = p.get('urls', {}),
+        requires_python = p.get('requires-python', ''),
+        dependencies    = p.get('dependencies', []),
+        extras          = p.get('optional-dependencies', {}),
+        scripts         = p.get('scripts', {}),
+        readme          = readme.get('file', '') if isinstance(readme, dict) else readme,
+        keywords        = p.get('keywords', []),
+        classifiers     = p.get('classifiers', []),
     )
 
-def _inline_doc(
-    lines: list[str], # source lines
-    lineno: int,       # 1-indexed line number
-    anchor: str,       # identifier to match before comment
-) -> str:              # inline comment text or ''
-    "Extract inline comment following an identifier on a source line."
-    if 0 < lineno <= len(lines):
-        if m := re.search(rf'\b{re.escape(anchor)}\b.*?#\s*(.+)', lines[lineno - 1]):
-            return m.group(1).strip()
-    return ''
+class _LineComments(dict):
+    """Line → inline comment table for one notebook, built on demand.
+
+    Each looked-up line is scanned once: a '#' with no quote before it is a
+    comment outright, anything else is tokenized so a '#' inside a string
+    default is not mistaken for one. Repeated lookups are dict hits.
+    Only signature lines are ever asked for, which keeps this far cheaper
+    than tokenizing the whole notebook (roughly 2x the cost of ast.parse).
+    """
+    def __init__(
+        self,             # LineComments instance
+        lines: list[str], # notebook source lines
+    ):
+        super().__init__()
+        self.lines = lines
+
+    def __missing__(
+        self,         # LineComments instance
+        lineno: int,  # 1-indexed line number
+    ) -> str:         # comment text without '#', or ''
+        "Tokenize one line on first lookup and remember its comment."
+        line = self.lines[lineno - 1] if 0 < lineno <= len(self.lines) else ''
+        doc, i = '', line.find('#')
+        if i >= 0 and '"' not in line[:i] and "'" not in line[:i]:
+            doc = line[i + 1:].strip()  # no quote before the '#': it must be a comment
+        elif i >= 0:
+            try:
+                for t in tokenize.generate_tokens(io.StringIO(line).readline):
+                    if t.type == tokenize.COMMENT:
+                        doc = t.string[1:].strip()
+                        break
+            except (tokenize.TokenError, SyntaxError):
+                pass  # unbalanced brackets on a lone signature line; comments come first
+        self[lineno] = doc
+        return doc
 
 def _parse_params(
-    fn,                # function AST node
-    lines: list[str],  # source lines for inline doc extraction
-) -> list[Param]:      # parameters with inline docs
-    "Extract parameters with inline docs from a function AST node."
+    fn,                          # function AST node
+    comments: dict[int, str],    # line → inline comment table
+) -> list[Param]:                # parameters with inline docs
+    """Extract parameters with inline docs from a function AST node.
+
+    A comment documents the last thing on its line: with `a, b, # doc` only
+    b gets the doc, and a return annotation on the same line takes it from both.
+    """
     if not hasattr(fn, 'args'): return []
     args, defs = fn.args.args, fn.args.defaults
     pad = [None] * (len(args) - len(defs))
+    owner = {a.lineno: a.arg for a in args}
+    if _has_return(fn): owner[fn.returns.lineno] = '->'
     return [
         Param(
             name    = a.arg,
-            anno    = ast.unparse(a.annotation) if a.annotation else '',
-            default = ast.unparse(d) if d else '',
-            doc     = _inline_doc(lines, a.lineno, a.arg),
+            anno    = sys.intern(ast.unparse(a.annotation)) if a.annotation else '',
+            default = sys.intern(ast.unparse(d)) if d else '',
+            doc     = sys.intern(comments[a.lineno]) if owner[a.lineno] == a.arg else '',
         )
         for a, d in zip(args, pad + defs)
         if a.arg not in ('self', 'cls')
     ]
 
+def _has_return(
+    fn,     # function AST node
+) -> bool:  # True if the annotation becomes a Return; `-> None` and other constants do not
+    "Whether internal_parse_return yields a Return, and so owns its line's comment."
+    return bool(getattr(fn, 'returns', None)) and not isinstance(fn.returns, ast.Constant)
+
 def _parse_return(
-    fn,                # function AST node
-    lines: list[str],  # source lines for inline doc extraction
-) -> Return | None:    # return annotation or None
+    fn,                        # function AST node
+    comments: dict[int, str],  # line → inline comment table
+) -> Return | None:            # return annotation or None
     "Extract return type and inline doc from a function AST node."
-    if not fn.returns or isinstance(fn.returns, ast.Constant): return None
-    doc = _inline_doc(lines, fn.returns.lineno, '->') if hasattr(fn.returns, 'lineno') else ''
-    return Return(anno=ast.unparse(fn.returns), doc=doc)
+    if not _has_return(fn): return None
+    return Return(anno=sys.intern(ast.unparse(fn.returns)), doc=sys.intern(comments[fn.returns.lineno]))
 
 def _parse_methods(
-    cls_node: ast.ClassDef, # class AST node
-    lines: list[str],       # source lines for inline doc extraction
-) -> list[Method]:          # methods with params and return info
+    cls_node: ast.ClassDef,   # class AST node
+    comments: dict[int, str], # line → inline comment table
+) -> list[Method]:            # methods with params and return info
     "Extract methods from a class definition."
     return [
         Method(
             name   = item.name,
             doc    = ast.get_docstring(item) or '',
-            params = _parse_params(item, lines),
-            ret    = _parse_return(item, lines),
+            params = _parse_params(item, comments),
+            ret    = _parse_return(item, comments),
         )
         for item in cls_node.body
         if isinstance(item, ast.FunctionDef)
     ]
 
 def _parse_class_params(
-    cls_node: ast.ClassDef, # class AST node
-    lines: list[str],       # source lines for inline doc extraction
-) -> list[Param]:           # params from __init__ or class attributes
+    cls_node: ast.ClassDef,   # class AST node
+    comments: dict[int, str], # line → inline comment table
+) -> list[Param]:             # params from __init__ or class attributes
     "Extract params from __init__ method if present, else annotated class attributes."
     for item in cls_node.body:
         if isinstance(item, ast.FunctionDef) and item.name == '__init__':
-            return _parse_params(item, lines)
+            return _parse_params(item, comments)
     return [
         Param(
             name = t.id,
-            anno = ast.unparse(a.annotation) if a.annotation else '',
-            doc  = _inline_doc(lines, a.lineno, t.id),
+            anno = sys.intern(ast.unparse(a.annotation)) if a.annotation else '',
+            doc  = sys.intern(comments[a.lineno]),
         )
         for a in cls_node.body
         if isinstance(a, ast.AnnAssign) and isinstance((t := a.target), ast.Name)
     ]
 
-def _src_with_decs(
-    node,              # AST node with potential decorators
-    lines: list[str],  # source lines
-) -> str:              # source including decorator lines
-    "Get source including decorators."
-    start = node.decorator_list[0].lineno - 1 if node.decorator_list else node.lineno - 1
-    return '\n'.join(lines[start:node.end_lineno])
-
-def _clean_src(
-    src: str, # source text with marimo decorators
-) -> str:     # source text without marimo decorators
-    "Remove marimo export decorators from source."
-    strip = tuple(f'@{d}' for d in EXPORT_DECORATORS)
-    return '\n'.join(
-        l for l in src.splitlines()
-        if not l.strip().startswith(strip)
-    )
+def _line_starts(
+    src: str,   # notebook text
+) -> list[int]: # offset of the start of line n at index n - 1, lines as ast counts them
+    "Line start offsets, so AST positions map to buffer offsets."
+    return [0] + [m.end() for m in re.finditer('\n', src)]
+
+def _offset(
+    src: str,          # notebook text
+    starts: list[int], # from internal_line_starts
+    lineno: int,       # 1-based AST line
+    col: int,          # AST column, in UTF-8 bytes
+) -> int:              # character offset into src
+    "Buffer offset of an AST position."
+    head = src[starts[lineno - 1]:starts[lineno - 1] + col]
+    return starts[lineno - 1] + (col if head.isascii() else len(head.encode()[:col].decode(errors='ignore')))
+
+def _span(
+    path: Path,            # notebook file
+    src: str,              # notebook text
+    start: int,            # offset of the first character
+    end: int,              # offset just past the last one
+    skip: list = (),       # (start, end) offsets to leave out of Span.clean
+    shared: Buffer | None = None, # the notebook's buffer with cfg.source_spans, else None
+) -> Span:                 # span into shared, or into a buffer of its own
+    "A Span over src[start:end], copying just that slice unless the buffer is shared."
+    if shared: return Span(shared, start, end, tuple(skip))
+    return Span(Buffer(str(path), src[start:end]), 0, end - start, tuple((s - start, e - start) for s, e in skip))
+
+def _export_span(
+    node,              # decorated definition AST node
+    path: Path,        # notebook file
+    src: str,          # notebook text
+    starts: list[int], # from internal_line_starts
+    shared: Buffer | None = None, # the notebook's buffer with cfg.source_spans
+) -> Span:             # whole lines from the first decorator to the last line
+    "Span of an export; the lines of its marimo decorators are what clean_src leaves out."
+    first = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+    end = starts[node.end_lineno] - 1 if node.end_lineno < len(starts) else len(src)
+    skip = [(starts[d.lineno - 1], starts[d.end_lineno])
+            for d in node.decorator_list if _is_export_dec(d)]
+    return _span(path, src, starts[first - 1], end, skip, shared)
 
 def _is_export_dec(
     d, # decorator AST node
@@ -137,6 +211,30 @@ def _classify(
     if isinstance(node, ast.AsyncFunctionDef): return ExportKind.ASYNC
     return ExportKind.FUNC
 
+def _refs(
+    *nodes,        # AST nodes to scan
+) -> tuple:        # sorted names read (Load context) anywhere inside
+    "Names a definition reads, for the bundle's reachability graph. Over-approximates: locals count too."
+    return tuple(sorted({n.id for node in nodes for n in ast.walk(node)
+                         if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}))
+
+def _bound_names(
+    node,   # statement from a setup cell
+) -> tuple: # sorted module-level names it binds
+    "Names a statement binds at module level: assignment targets, def/class names and imports, not nested scopes."
+    out = set()
+    def visit(n):
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            out.add(n.name)
+            return
+        if isinstance(n, ast.Lambda): return
+        if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store): out.add(n.id)
+        if isinstance(n, (ast.Import, ast.ImportFrom)):
+            out.update(a.asname or a.name.split('.')[0] for a in n.names)
+        for c in ast.iter_child_nodes(n): visit(c)
+    visit(node)
+    return tuple(sorted(out))
+
 def _parse_file(
     path: Path,    # path to notebook .py file
     cfg: Config,   # project configuration (for renames)
@@ -149,8 +247,11 @@ def _parse_file(
         3. else      → skip
     """
     src = path.read_text()
-    tree = ast.parse(src)
+    tree = ast.parse(src, filename=str(path))
     lines = src.splitlines()
+    comments = _LineComments(lines)
+    starts = _line_starts(src)
+    shared = Buffer(str(path), src) if cfg.source_spans else None
 
     imports, consts, setup, exports = [], [], [], []
 
@@ -160,14 +261,15 @@ def _parse_file(
         if isinstance(n, ast.With):
             for s in n.body:
                 if isinstance(s, (ast.Import, ast.ImportFrom)):
-                    imports.append(Import(src=ast.unparse(s)))
+                    imports.append(Import(src=ast.unparse(s), names=_bound_names(s)))
                 elif isinstance(s, ast.Assign):
                     for t in s.targets:
                         if isinstance(t, ast.Name):
-                            consts.append(Const(name=t.id, src=ast.unparse(s)))
+                            consts.append(Const(name=t.id, src=ast.unparse(s), refs=_refs(s.value)))
                 else:
-                    code = ast.get_source_segment(src, s) or ast.unparse(s)
-                    setup.append(Setup(src=code))
+                    source = _span(path, src, _offset(src, starts, s.lineno, s.col_offset),
+                                           _offset(src, starts, s.end_lineno, s.end_col_offset), shared=shared)
+                    setup.append(Setup(source=source, refs=_refs(s), defines=_bound_names(s)))
             continue
 
         # ── Branch 2: Decorated exports ──────────────────────
@@ -178,30 +280,29 @@ def _parse_file(
             continue
 
         kind = _classify(n)
-        full_src = _src_with_decs(n, lines)
         final_name = rename(n.name, cfg.renames)
 
         if kind == ExportKind.CLASS:
-            params  = _parse_class_params(n, lines)
-            methods = _parse_methods(n, lines)
+            params  = _parse_class_params(n, comments)
+            methods = _parse_methods(n, comments)
             ret     = None
         else:
-            params  = _parse_params(n, lines)
+            params  = _parse_params(n, comments)
             methods = []
-            ret     = _parse_return(n, lines)
+            ret     = _parse_return(n, comments)
 
         exports.append(Export(
             name       = n.name,
             final_name = final_name,
             public     = not final_name.startswith('_'),
             kind       = kind,
-            src        = full_src,
-            clean_src  = _clean_src(full_src),
+            source     = _export_span(n, path, src, starts, shared),
             doc        = ast.get_docstring(n) or '',
             params     = params,
             methods    = methods,
             ret        = ret,
             lineno     = n.lineno,
+            refs       = _refs(n),
         ))
 
         # ── Branch 3: everything else → skip (implicit) ─────
@@ -220,33 +321,144 @@ def _module_name(
     name = re.sub(r'^[a-z]_(\w+)', r'\1', f.stem)
     return None if name.startswith('test') else name
 
-def read_project(
-    root: str = '.', # project root containing pyproject.toml and notebooks
-) -> Project:        # complete parsed project
-    """Read an entire marimo-dev project into a Project.
+def _parse_all(
+    files: list[Path],        # notebook files in build order
+    cfg: Config,              # project configuration
+    cache: ParseCache | None, # parse cache, or None to always parse
+) -> list[ParsedFile]:        # one result per file, same order as files
+    """Parse notebooks, serially or across cfg.jobs worker processes.
 
-    Single entry point. Call once, get everything.
+    Cache hits are resolved up front so only misses reach the pool.
+    Every failure is collected; they are raised together as one ExceptionGroup
+    after all other notebooks have been parsed (and cached).
     """
+    with span('cache lookup', files=len(files)):
+        results = [cache.lookup(f) if cache else None for f in files]
+    todo = [i for i, r in enumerate(results) if r is None]
+    jobs = min(cfg.jobs or os.cpu_count() or 1, len(todo))
 
-    cfg  = read_config(root)
-    meta = _read_meta(root)
-    nbs  = Path(root) / cfg.nbs
+    errors = []
+    if jobs > 1:
+        with span('parse pool', jobs=jobs, files=len(todo)), ProcessPoolExecutor(jobs) as pool:
+            futures = [(i, pool.submit(_parse_file, files[i], cfg)) for i in todo]
+            for i, fut in futures:
+                try: results[i] = fut.result()
+                except Exception as e: errors.append((i, e))
+    else:
+        for i in todo:
+            try:
+                with span('parse', file=files[i].name): results[i] = _parse_file(files[i], cfg)
+            except Exception as e: errors.append((i, e))
 
-    init_extras, modules = ParsedFile([], [], [], []), []
+    if cache is not None:
+        with span('cache store', files=len(todo)):
+            for i in todo:
+                if results[i] is not None: cache.store(files[i], results[i])
+            cache.save()
+
+    if errors:
+        for i, e in errors: e.add_note(f'while parsing {files[i]}')
+        raise ExceptionGroup(f'{len(errors)} notebook(s) failed to parse', [e for _, e in errors])
+    return results
+
+def _list_notebooks(
+    nbs: Path,    # notebook directory
+    cfg: Config,  # project configuration
+) -> list[tuple[Path, str | None]]: # (file, module name); name is None for the init file
+    "Notebooks that take part in the build, in build order."
+    out = []
     for f in sorted(nbs.glob('*.py')):
         if f.name == cfg.init:
-            init_extras = _parse_file(f, cfg)
+            out.append((f, None))
+        elif (name := _module_name(f, cfg)) is not None:
+            out.append((f, name))
+    return out
+
+def _module_deps(
+    imports: list[Import], # setup-cell imports of one notebook
+    mod_names: set[str],   # module names in the project
+) -> tuple:                # project modules imported, in first-import order
+    "Which project modules a notebook's setup cell imports from."
+    out = []
+    for i in imports:
+        words = i.src.split()
+        targets = [words[1]] if words[0] == 'from' else [p.split(' as ')[0].strip() for p in i.src[7:].split(',')]
+        for t in targets:
+            name = re.sub(r'^[a-z]_', '', t.split('.')[0])
+            if name in mod_names and name not in out: out.append(name)
+    return tuple(out)
+
+def _assemble(
+    prev: Project | None,                   # earlier project to carry unparsed modules over from
+    meta: Meta,                             # project metadata
+    cfg: Config,                            # project configuration
+    listing: list[tuple[Path, str | None]], # from _list_notebooks
+    parsed: dict[Path, ParsedFile],         # freshly parsed files
+) -> Project:                               # assembled project
+    "Build a Project from fresh parses, reusing modules from prev for everything else."
+    old = {m.nb_stem: m for m in prev.modules} if prev else {}
+    mod_names = {name for _, name in listing if name is not None}
+    init_extras, modules = ParsedFile([], [], [], []), []
+    for f, name in listing:
+        p = parsed.get(f)
+        if name is None:
+            init_extras = p if p is not None else prev.init_extras
+            continue
+        if p is None:
+            m = old[f.stem]
+            deps = _module_deps(m.imports, mod_names)
+            modules.append(m if deps == m.deps else replace(m, deps=deps))
             continue
-        name = _module_name(f, cfg)
-        if name is None: continue
-        parsed = _parse_file(f, cfg)
         modules.append(Module(
             name    = name,
             nb_stem = f.stem,
-            imports = parsed.imports,
-            consts  = parsed.consts,
-            setup   = parsed.setup,
-            exports = parsed.exports,
+            imports = p.imports,
+            consts  = p.consts,
+            setup   = p.setup,
+            exports = p.exports,
+            deps    = _module_deps(p.imports, mod_names),
         ))
-
     return Project(meta=meta, config=cfg, init_extras=init_extras, modules=modules)
+
+def read_project(
+    root: str = '.', # project root containing pyproject.toml and notebooks
+    **overrides,     # Config fields to override, e.g. cache=False from the CLI
+) -> Project:        # complete parsed project
+    """Read an entire marimo-dev project into a Project.
+
+    Single entry point. Call once, get everything.
+    Unchanged notebooks come from the parse cache unless cfg.cache is off,
+    and cfg.jobs > 1 parses the rest in parallel. Module order never changes.
+    """
+
+    with span('read_config'):
+        cfg  = replace(read_config(root), **overrides)
+        meta = _read_meta(root)
+        listing = _list_notebooks(Path(root) / cfg.nbs, cfg)
+
+    files = [f for f, _ in listing]
+    cache = ParseCache.open(cfg, (__file__,)) if cfg.cache else None
+    parsed = dict(zip(files, _parse_all(files, cfg, cache)))
+    with span('assemble'):
+        return _assemble(None, meta, cfg, listing, parsed)
+
+def refresh_project(
+    proj: Project,      # previously read project
+    changed: set[Path], # notebook files created, modified or deleted since
+    root: str = '.',    # project root the project was read from
+) -> Project:           # new project; untouched modules are shared with proj
+    """Reparse only the changed notebooks of an already-read Project.
+
+    Config and Meta are reused, so pyproject.toml is not re-read; call
+    read_project again when it changes. Deleted notebooks drop out, new
+    ones are parsed, and module order matches a fresh read_project.
+    """
+    cfg = proj.config
+    known = {m.nb_stem for m in proj.modules}
+    listing = _list_notebooks(Path(root) / cfg.nbs, cfg)
+    todo = [f for f, name in listing
+            if f in changed or (name is not None and f.stem not in known)]
+
+    cache = ParseCache.open(cfg, (__file__,)) if cfg.cache else None
+    parsed = dict(zip(todo, _parse_all(todo, cfg, cache)))
+    return _assemble(proj, proj.meta, cfg, listing, parsed)
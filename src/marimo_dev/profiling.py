@@ -0,0 +1,106 @@
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+import cProfile, json, os, threading, time
+
+ACTIVE = []
+NOOP = nullcontext()
+
+@dataclass
+class Trace:
+    "Spans recorded while profiling, as Chrome trace 'X' events."
+    t0: int = field(default_factory=time.perf_counter_ns) # start, perf_counter_ns
+    events: list = field(default_factory=list)            # {'name','ph','ts','dur','pid','tid','args'}, ts/dur in µs
+    prof: cProfile.Profile | None = None                  # running cProfile, if requested
+
+class _Span:
+    "Context manager appending one complete event to a Trace on exit."
+    __slots__ = ('trace', 'name', 'args', 't')
+
+    def __init__(
+        self,          # _Span instance
+        trace: Trace,  # trace to record into
+        name: str,     # span name, the summary groups by it
+        args: dict,    # extra detail shown in the trace viewer
+    ):
+        self.trace, self.name, self.args = trace, name, args
+
+    def __enter__(
+        self, # _Span instance
+    ):
+        self.t = time.perf_counter_ns()
+
+    def __exit__(
+        self,  # _Span instance
+        *exc,  # exception info, passed through
+    ):
+        end = time.perf_counter_ns()
+        self.trace.events.append({
+            'name': self.name, 'ph': 'X', 'ts': (self.t - self.trace.t0) / 1e3, 'dur': (end - self.t) / 1e3,
+            'pid': os.getpid(), 'tid': threading.get_ident(), 'args': self.args,
+        })
+
+def span(
+    name: str, # phase name, e.g. 'parse'
+    **args,    # detail for the trace viewer, e.g. file='a_types.py'
+):             # context manager
+    "Time a block into the active Trace; the shared no-op context when profiling is off."
+    return _Span(ACTIVE[0], name, args) if ACTIVE else NOOP
+
+def start_profile(
+    cprofile: bool = False, # also run cProfile for a function-level dump
+) -> Trace:                 # the now-active trace
+    "Begin recording spans (and optionally cProfile) process-wide."
+    trace = Trace(prof=cProfile.Profile() if cprofile else None)
+    ACTIVE[:] = [trace]
+    if trace.prof: trace.prof.enable()
+    return trace
+
+def _self_times(
+    events: list, # Chrome 'X' events
+) -> list[float]: # per event: its duration minus its direct children's, in µs
+    "Exclusive time of each span, from nesting on the same thread."
+    own = [e['dur'] for e in events]
+    order = sorted(range(len(events)), key=lambda i: (events[i]['tid'], events[i]['ts'], -events[i]['dur']))
+    stack = []
+    for i in order:
+        e = events[i]
+        while stack and (events[stack[-1]]['tid'] != e['tid'] or
+                         events[stack[-1]]['ts'] + events[stack[-1]]['dur'] <= e['ts']):
+            stack.pop()
+        if stack: own[stack[-1]] -= e['dur']
+        stack.append(i)
+    return own
+
+def render_profile(
+    trace: Trace, # finished trace
+) -> str:         # aligned text table, slowest total first
+    "Summarize spans by name: calls, total and self milliseconds, share of the whole run."
+    events = trace.events
+    if not events: return "No spans recorded"
+    wall = max(e['ts'] + e['dur'] for e in events) - min(e['ts'] for e in events)
+    rows = {}
+    for e, own in zip(events, _self_times(events)):
+        r = rows.setdefault(e['name'], [0, 0.0, 0.0])
+        r[0] += 1; r[1] += e['dur']; r[2] += own
+    w = max(len(n) for n in rows) + 2
+    lines = [f"{'span':<{w}}{'calls':>7}{'total ms':>11}{'self ms':>11}{'self %':>8}"]
+    for name, (n, total, own) in sorted(rows.items(), key=lambda kv: -kv[1][1]):
+        lines.append(f"{name:<{w}}{n:>7}{total / 1e3:>11.2f}{own / 1e3:>11.2f}{own / wall * 100 if wall else 0:>7.1f}%")
+    return '\n'.join(lines)
+
+def write_profile(
+    trace: Trace,                  # trace from start_profile
+    out: str = '.marimo-dev',      # directory for profile.json / profile.prof
+) -> str:                          # summary table followed by where the files went
+    "Stop recording, write the Chrome trace (and cProfile stats) and return the summary."
+    ACTIVE.clear()
+    if trace.prof: trace.prof.disable()
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    (out / 'profile.json').write_text(json.dumps({'traceEvents': trace.events, 'displayTimeUnit': 'ms'}))
+    msg = f"{render_profile(trace)}\n\nWrote {out / 'profile.json'} (open in chrome://tracing or ui.perfetto.dev)"
+    if trace.prof:
+        trace.prof.dump_stats(out / 'profile.prof')
+        msg += f"\nWrote {out / 'profile.prof'} (python -m pstats)"
+    return msg
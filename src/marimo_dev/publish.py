@@ -1,7 +1,7 @@
 from pathlib import Path
-import configparser, shutil, subprocess
+import base64, configparser, gzip, hashlib, io, os, re, shutil, subprocess, tarfile, time, zipfile
 from .types import Project
-from .build_pkg import build
+from .build_pkg import build, render_package
 
 PYPI_URLS = {'testpypi': 'https://test.pypi.org/legacy/', 'pypi': 'https://upload.pypi.org/legacy/'}
 TOKEN_URLS = {'testpypi': 'https://test.pypi.org/manage/account/', 'pypi': 'https://pypi.org/manage/account/'}
@@ -10,9 +10,13 @@ TOKEN_URLS = {'testpypi': 'https://test.pypi.org/manage/account/', 'pypi': 'http
     marimo-dev publish.
 
     Build distribution and upload to PyPI.
-    Reads credentials from ~/.pypirc, calls uv build + uv publish.
+    The wheel and sdist are written straight from the in-memory Project
+    (no build backend, no subprocess); uploading uses ~/.pypirc + uv publish.
 
     Public API:
+        dist(project, out) -> list[str]
+        build_wheel(project, out) -> str
+        build_sdist(project, out) -> str
         publish(project, test) -> None
     """
 
@@ -39,6 +43,125 @@ def _read_pypirc(
     username = cfg[section].get('username', '__token__')
     return (username, password)
 
+def _epoch(
+) -> int: # archive timestamp in seconds
+    "SOURCE_DATE_EPOCH if set, else 1980-01-01, the earliest time a zip can hold."
+    return max(int(os.environ.get('SOURCE_DATE_EPOCH', 0)), 315532800)
+
+def _dist_name(
+    name: str, # project name, e.g. 'marimo-dev'
+) -> str:      # normalized file name part, e.g. 'marimo_dev'
+    "Distribution name as used in wheel and sdist file names."
+    return re.sub(r'[-_.]+', '_', name).lower()
+
+def render_metadata(
+    proj: Project,  # complete parsed project
+    root: str = '', # project root for the readme, defaults to proj.config.root
+) -> str:           # METADATA / PKG-INFO text (core metadata 2.1)
+    "Core metadata from Meta, with the readme as the long description."
+    meta = proj.meta
+    lines = ['Metadata-Version: 2.1', f'Name: {meta.name}', f'Version: {meta.version}']
+    if meta.desc:    lines.append(f'Summary: {meta.desc}')
+    if meta.author:  lines.append(f"{'Author-email' if '<' in meta.author else 'Author'}: {meta.author}")
+    if meta.license: lines.append(f'License: {meta.license}')
+    if meta.keywords: lines.append(f"Keywords: {','.join(meta.keywords)}")
+    lines += [f'Classifier: {c}' for c in meta.classifiers]
+    lines += [f'Project-URL: {k}, {v}' for k, v in meta.urls.items()]
+    if meta.requires_python: lines.append(f'Requires-Python: {meta.requires_python}')
+    lines += [f'Requires-Dist: {d}' for d in meta.dependencies]
+    for extra, reqs in meta.extras.items():
+        lines.append(f'Provides-Extra: {extra}')
+        for r in reqs:
+            req, _, marker = r.partition(';')
+            marker = f'({marker.strip()}) and extra == "{extra}"' if marker.strip() else f'extra == "{extra}"'
+            lines.append(f'Requires-Dist: {req.strip()}; {marker}')
+    body = ''
+    if meta.readme:
+        readme = Path(root or proj.config.root) / meta.readme
+        kind = {'.md': 'text/markdown', '.rst': 'text/x-rst'}.get(readme.suffix.lower(), 'text/plain')
+        lines.append(f'Description-Content-Type: {kind}')
+        body = '\n' + readme.read_text()
+    return '\n'.join(lines) + '\n' + body
+
+def _record_line(
+    path: str,   # archive path
+    data: bytes, # file contents
+) -> str:        # RECORD row: path,sha256=<urlsafe b64, no padding>,size
+    "One RECORD entry (PEP 376 / wheel spec)."
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+    return f'{path},sha256={digest},{len(data)}'
+
+def wheel_files(
+    proj: Project, # complete parsed project
+) -> dict[str, bytes]: # archive path → contents, in archive order, RECORD last
+    "Everything that goes into the py3-none-any wheel."
+    meta, pkg = proj.meta, proj.meta.pkg_name
+    info = f'{_dist_name(meta.name)}-{meta.version}.dist-info'
+    files = {f'{pkg}/{n}': text.encode() for n, text in sorted(render_package(proj).items())}
+    files[f'{info}/METADATA'] = render_metadata(proj).encode()
+    files[f'{info}/WHEEL'] = ('Wheel-Version: 1.0\nGenerator: marimo-dev\n'
+                              'Root-Is-Purelib: true\nTag: py3-none-any\n').encode()
+    if meta.scripts:
+        files[f'{info}/entry_points.txt'] = ('[console_scripts]\n' + ''.join(
+            f'{k} = {v}\n' for k, v in meta.scripts.items())).encode()
+    record = [_record_line(p, d) for p, d in files.items()] + [f'{info}/RECORD,,']
+    files[f'{info}/RECORD'] = ('\n'.join(record) + '\n').encode()
+    return files
+
+def build_wheel(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> str:              # path to the .whl
+    "Write {name}-{version}-py3-none-any.whl, byte-for-byte reproducible."
+    meta = proj.meta
+    path = Path(proj.config.root) / out / f'{_dist_name(meta.name)}-{meta.version}-py3-none-any.whl'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stamp = time.gmtime(_epoch())[:6]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in wheel_files(proj).items():
+            info = zipfile.ZipInfo(name, date_time=stamp)
+            info.external_attr = 0o644 << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            z.writestr(info, data)
+    return str(path)
+
+def build_sdist(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> str:              # path to the .tar.gz
+    """Write {name}-{version}.tar.gz: PKG-INFO, pyproject.toml, readme, LICENSE*
+    and the rendered package under the out directory, buildable by the
+    project's own build backend.
+    """
+    cfg, meta = proj.config, proj.meta
+    root, base = Path(cfg.root), f'{_dist_name(meta.name)}-{meta.version}'
+    files = {'PKG-INFO': render_metadata(proj).encode(),
+             'pyproject.toml': (root / 'pyproject.toml').read_bytes()}
+    for extra in [meta.readme] + sorted(p.name for p in root.glob('LICEN[CS]E*')):
+        if extra and (root / extra).is_file(): files[extra] = (root / extra).read_bytes()
+    for n, text in render_package(proj).items():
+        files[f'{cfg.out}/{meta.pkg_name}/{n}'] = text.encode()
+
+    path = root / out / f'{base}.tar.gz'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    epoch = _epoch()
+    with open(path, 'wb') as fh, gzip.GzipFile(fileobj=fh, mode='wb', mtime=epoch, filename='') as gz, \
+         tarfile.open(fileobj=gz, mode='w', format=tarfile.PAX_FORMAT) as tar:
+        for name in sorted(files):
+            info = tarfile.TarInfo(f'{base}/{name}')
+            info.size, info.mtime, info.mode = len(files[name]), epoch, 0o644
+            tar.addfile(info, io.BytesIO(files[name]))
+    return str(path)
+
+def dist(
+    proj: Project,     # complete parsed project
+    out: str = 'dist', # output directory, relative to the project root
+) -> list[str]:        # paths of the sdist and the wheel
+    "Build the sdist and wheel in-process and report their sizes."
+    paths = [build_sdist(proj, out), build_wheel(proj, out)]
+    for p in paths: print(f"Wrote {p} ({Path(p).stat().st_size:,} bytes)")
+    return paths
+
 def publish(
     proj: Project,  # complete parsed project
     test: bool = True, # True for TestPyPI, False for PyPI
@@ -57,9 +180,9 @@ def publish(
     print("Building package from notebooks...")
     build(proj)
 
-    shutil.rmtree('dist', ignore_errors=True)
+    shutil.rmtree(Path(proj.config.root) / 'dist', ignore_errors=True)
     print("Building distribution...")
-    subprocess.run(['uv', 'build'], check=True)
+    dist(proj)
 
     print(f"Publishing to {target}...")
     try:
@@ -0,0 +1,117 @@
+from pathlib import Path
+import io, json, os, socket, sys, time
+
+SOCKET = '.marimo-dev/md.sock'
+
+def _recv(
+    conn: socket.socket, # connected socket whose peer has shut down writing
+) -> bytes:              # everything it sent
+    "Read until EOF."
+    chunks = []
+    while chunk := conn.recv(65536): chunks.append(chunk)
+    return b''.join(chunks)
+
+def request(
+    argv: list[str],         # md arguments, e.g. ['build']
+    path: str = SOCKET,      # daemon socket
+    timeout: float = 120.0,  # seconds to wait for the reply
+) -> tuple[str, int] | None: # (captured output, exit code), None if no daemon answers
+    "Thin client: hand one command to a running daemon; None sends the caller back to a local run."
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(1.0)
+            s.connect(path)
+            s.settimeout(timeout)
+            s.sendall(json.dumps({'argv': argv}).encode())
+            s.shutdown(socket.SHUT_WR)
+            reply = json.loads(_recv(s))
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    except (TimeoutError, OSError, ValueError) as e:
+        print(f"md serve on {path} did not answer ({e or type(e).__name__}), running locally", file=sys.stderr)
+        return None
+    return reply['out'], reply['code']
+
+def _listen(
+    path: str, # socket path
+) -> socket.socket: # bound, listening socket
+    "Bind the daemon socket, replacing a stale one left by a dead daemon."
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if request(['ping'], path) is not None: raise RuntimeError(f"md serve is already running on {path}")
+    Path(path).unlink(missing_ok=True)
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen()
+    return srv
+
+def _daemonize(
+    log: str, # file receiving the daemon's stdout/stderr
+):
+    "Detach from the terminal: double fork, new session, stdio to /dev/null and the log."
+    if os.fork(): os._exit(0)
+    os.setsid()
+    if os.fork(): os._exit(0)
+    null, out = os.open(os.devnull, os.O_RDONLY), os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    os.dup2(null, 0); os.dup2(out, 1); os.dup2(out, 2)
+    sys.stdout = io.TextIOWrapper(os.fdopen(1, 'wb', 0), write_through=True)
+    sys.stderr = sys.stdout
+
+def serve(
+    run,                   # run(proj, argv, only): one md command against proj; the CLI's dispatcher
+    root: str = '.',       # project root, also the daemon's working directory
+    daemon: bool = False,  # fork into the background, logging to .marimo-dev/serve.log
+    path: str = SOCKET,    # socket to listen on
+    **overrides,           # Config overrides, as for read_project
+):
+    """Hold a parsed Project and answer md requests until `md serve --stop` or Ctrl-C.
+
+    Before each request the notebook directory and pyproject.toml are stat'ed;
+    changes go through `refresh` exactly as in `md watch`. `only` passed to
+    `run` names the modules changed since the last build (None for all),
+    so a build after a one-notebook edit renders just that notebook and its
+    importers.
+    """
+    from contextlib import redirect_stderr, redirect_stdout
+    import traceback
+    from .parse import read_project
+    from .watch import refresh, snapshot
+    os.chdir(root)
+    srv = _listen(path)
+    if daemon:
+        print(f"md serve listening on {path} (log: .marimo-dev/serve.log)")
+        _daemonize('.marimo-dev/serve.log')
+    proj = read_project(**overrides)
+    dirs = [Path(proj.config.nbs), Path('.')]
+    prev, pending = snapshot(dirs), None
+    print(f"Serving {proj.meta.name} on {path} (pid {os.getpid()})", flush=True)
+    try:
+        while True:
+            conn, _ = srv.accept()
+            with conn:
+                argv = json.loads(_recv(conn) or b'{}').get('argv') or ['']
+                t0, out, code = time.perf_counter(), io.StringIO(), 0
+                if argv[0] == 'ping': pass
+                elif argv[0] == 'stop': out.write("Stopped md serve\n")
+                else:
+                    cur = snapshot(dirs)
+                    changed = {p for p in cur.keys() | prev.keys() if cur.get(p) != prev.get(p)}
+                    try:
+                        with redirect_stdout(out), redirect_stderr(out):
+                            if fresh := refresh(proj, changed, '.', **overrides):
+                                proj, only = fresh
+                                pending = None if only is None or pending is None else pending | only
+                            prev = cur
+                            run(proj, argv, pending)
+                        if argv[0] == 'build': pending = set()
+                    except SystemExit as e: code = e.code if isinstance(e.code, int) else 1
+                    except Exception:
+                        out.write(traceback.format_exc())
+                        code = 1
+                conn.sendall(json.dumps({'out': out.getvalue(), 'code': code}).encode())
+                print(f"{' '.join(argv)} → {code} in {(time.perf_counter() - t0) * 1e3:.1f} ms", flush=True)
+                if argv[0] == 'stop': break
+    except KeyboardInterrupt:
+        print("Stopped md serve")
+    finally:
+        srv.close()
+        Path(path).unlink(missing_ok=True)
@@ -1,6 +1,7 @@
-from dataclasses import dataclass, field
+from dataclasses import InitVar, dataclass, field
 from enum import Enum
 from pathlib import Path
+import graphlib, heapq
 
 EXPORT_DECORATORS = ('app.function', 'app.class_definition')
 
@@ -27,6 +28,13 @@ class Config:
     skip_prefixes: tuple  = ('XX_', 'test_')  # filename prefixes to ignore
     renames: dict         = field(default_factory=dict)  # name prefix substitutions
     application: str|None = None          # entry point e.g. "module:obj" or "module:obj:runner"
+    cache: bool           = True          # reuse parse results from .marimo-dev/cache
+    cache_size: int       = 64            # parse cache size limit in MB
+    jobs: int             = 1             # parser processes (0 = one per CPU)
+    lazy_init: bool       = False         # __init__.py imports modules on first attribute access
+    docs_split: bool      = False         # HTML docs as one page per module instead of one index.html
+    compress: bool        = False         # also write .gz (and .zst where supported) next to each docs file
+    source_spans: bool    = False         # Export/Setup source as spans into one shared buffer per notebook
 
     @property
     def app_parts(
@@ -38,7 +46,7 @@ class Config:
         if len(parts) < 2: return None
         return (parts[0], parts[1], parts[2] if len(parts) > 2 else None)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Param:
     "A function parameter with optional inline documentation."
     name: str               # parameter name
@@ -46,13 +54,13 @@ class Param:
     default: str = ''       # default value
     doc: str = ''
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Return:
     "A return annotation with optional inline documentation."
     anno: str               # return type
     doc: str = ''
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Method:
     "A class method with parameters and return info."
     name: str               # method name
@@ -60,21 +68,128 @@ class Method:
     params: list[Param]  = field(default_factory=list)
     ret: Return|None     = None
 
-@dataclass
+@dataclass(frozen=True, slots=True, eq=False)
+class Buffer:
+    "Source text shared by every Span into it: a whole notebook, or a single definition."
+    path: str               # notebook file it came from
+    text: str
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Span:
+    "A definition's place in a Buffer. Compares by the text it covers, not by buffer."
+    buf: Buffer             # shared text
+    start: int              # offset of the first line (first decorator for exports)
+    end: int                # offset just past the last character
+    skip: tuple = ()        # (start, end) offsets of marimo decorator lines, newline included
+
+    @property
+    def text(
+        self, # Span instance
+    ) -> str: # the covered source, decorators included
+        "Slice the source out of the buffer."
+        return self.buf.text[self.start:self.end]
+
+    def chunks(
+        self, # Span instance
+    ) -> list[str]: # consecutive slices of the source without its marimo decorator lines
+        "The clean source as buffer slices, for writers that stream."
+        out, pos = [], self.start
+        for s, e in self.skip:
+            out.append(self.buf.text[pos:s])
+            pos = e
+        out.append(self.buf.text[pos:self.end])
+        return out
+
+    @property
+    def clean(
+        self, # Span instance
+    ) -> str: # source without marimo decorator lines
+        "Join chunks()."
+        return ''.join(self.chunks())
+
+    def __eq__(
+        self,  # Span instance
+        other, # object to compare with
+    ) -> bool: # same text and same decorator lines, wherever they live
+        if not isinstance(other, Span): return NotImplemented
+        return (self.text == other.text and
+                [(s - self.start, e - self.start) for s, e in self.skip] ==
+                [(s - other.start, e - other.start) for s, e in other.skip])
+
+    def __hash__(
+        self, # Span instance
+    ) -> int: # hash of the covered text
+        return hash(self.text)
+
+    @classmethod
+    def from_text(
+        cls,                      # Span class
+        text: str,                # source, decorators included
+        clean: str | None = None, # text minus whole lines; None leaves out the marimo decorator lines
+        path: str = '',           # notebook file, if any
+    ) -> 'Span':                  # span over a Buffer of its own
+        "A Span for source that did not come from the parser."
+        marks, want = tuple(f'@{d}' for d in EXPORT_DECORATORS), None if clean is None else clean.splitlines(True)
+        skip, pos, i = [], 0, 0
+        for line in text.splitlines(True):
+            if want is None: keep = not line.strip().startswith(marks)
+            else: keep = i < len(want) and line == want[i]
+            if keep: i += 1
+            else: skip.append((pos, pos + len(line)))
+            pos += len(line)
+        span = cls(Buffer(path, text), 0, len(text), tuple(skip))
+        if clean is not None and span.clean != clean: raise ValueError("clean_src must be src with whole lines removed")
+        return span
+
+class _SourceText:
+    """`src` / `clean_src` of Export and Setup: read from the Span, and taken
+    as text by the constructor (an InitVar whose default is read through here)."""
+    __slots__ = ('clean',)
+
+    def __init__(
+        self,        # internal_SourceText instance
+        clean: bool, # serve Span.clean instead of Span.text
+    ):
+        self.clean = clean
+
+    def __get__(
+        self,          # internal_SourceText instance
+        obj,           # Export or Setup, None on class access
+        cls=None,      # owner class
+    ) -> str | None:   # the source text, '' without a Span; None (the InitVar default) on the class
+        if obj is None: return None
+        if obj.source is None: return ''
+        return obj.source.clean if self.clean else obj.source.text
+
+@dataclass(frozen=True, slots=True)
 class Import:
     "An import statement from a setup cell."
     src: str
+    names: tuple = ()       # names it binds ('*' for a star import)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Const:
     "A constant assignment from a setup cell."
     name: str               # variable name
     src: str
+    refs: tuple = ()        # global names the value reads
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Setup:
     "Arbitrary setup code that is not an import or constant."
-    src: str
+    source: Span|None = None  # where the statement's text lies
+    refs: tuple = ()          # global names it reads
+    defines: tuple = ()       # global names it binds
+    src: InitVar[str|None] = _SourceText(clean=False) # statement source, sliced from the buffer
+
+    def __post_init__(
+        self,             # Setup instance
+        src: str | None,  # statement text, when constructed without a Span
+    ):
+        "Give a Setup made from text a Span of its own; an explicit source wins."
+        if isinstance(self.source, str): src = self.source
+        elif self.source is not None or not src: return
+        object.__setattr__(self, 'source', Span.from_text(src, src))
 
 class ExportKind(Enum):
     "Classification of an exported definition."
@@ -82,20 +197,32 @@ class ExportKind(Enum):
     ASYNC = 'async'
     CLASS = 'class'
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Export:
     "A decorated function or class marked for export."
     name: str                            # original name in notebook
     final_name: str = ''                 # name after renames (set by parser)
     public: bool = True                  # part of public API (set by parser)
     kind: ExportKind = ExportKind.FUNC   # func | async | class
-    src: str = ''                        # source WITH decorators (original)
-    clean_src: str = ''                  # source WITHOUT marimo decorators
+    source: Span|None = None             # where the definition's text lies (set by parser)
     doc: str = ''                        # docstring
     params: list[Param]  = field(default_factory=list)
     methods: list[Method]= field(default_factory=list)
     ret: Return|None     = None
     lineno: int          = 0
+    refs: tuple          = ()            # names read anywhere in the definition
+    src: InitVar[str|None]       = _SourceText(clean=False) # source WITH decorators (original)
+    clean_src: InitVar[str|None] = _SourceText(clean=True)  # source WITHOUT marimo decorators, as packaged
+
+    def __post_init__(
+        self,                   # Export instance
+        src: str | None,        # source text, when constructed without a Span
+        clean_src: str | None,  # src minus whole lines; None leaves out the marimo decorator lines
+    ):
+        "Give an Export made from text a Span of its own; an explicit source wins."
+        if isinstance(self.source, str): src, clean_src = self.source, None
+        elif self.source is not None or not src: return
+        object.__setattr__(self, 'source', Span.from_text(src, clean_src))
 
 @dataclass
 class ParsedFile:
@@ -105,7 +232,48 @@ class ParsedFile:
     setup:   list[Setup]
     exports: list[Export]
 
-@dataclass
+def _cached(
+    obj,       # Module or Project
+    key: str,  # view name
+    make,      # zero-argument function computing the view
+):             # the view, computed once per state of obj
+    "Look a view up in obj.memo, building it on first use."
+    if obj.memo is None: object.__setattr__(obj, 'memo', {})
+    if key not in obj.memo: obj.memo[key] = make()
+    return obj.memo[key]
+
+def _sccs(
+    graph: dict, # node → nodes it references
+) -> list[tuple]: # strongly connected components, each after every component it references
+    "Tarjan's algorithm without recursion; members of a component keep graph order."
+    pos = {n: i for i, n in enumerate(graph)}
+    index, low, stack, on, out = {}, {}, [], set(), []
+    def visit(v):
+        index[v] = low[v] = len(index)
+        stack.append(v); on.add(v)
+        return v, iter(graph.get(v, ()))
+    for root in graph:
+        if root in index: continue
+        work = [visit(root)]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if w not in index:
+                    work.append(visit(w))
+                    break
+                if w in on: low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work: low[work[-1][0]] = min(low[work[-1][0]], low[v])
+                if low[v] != index[v]: continue
+                comp = []
+                while not comp or comp[-1] != v:
+                    comp.append(stack.pop())
+                    on.discard(comp[-1])
+                out.append(tuple(sorted(comp, key=pos.get)))
+    return out
+
+@dataclass(slots=True)
 class Module:
     "A parsed notebook file containing imports, setup, and exports."
     name: str              # e.g. 'core' (prefix stripped)
@@ -114,6 +282,17 @@ class Module:
     consts: list[Const]    = field(default_factory=list)
     setup: list[Setup]     = field(default_factory=list)
     exports: list[Export]  = field(default_factory=list)
+    deps: tuple            = ()    # project modules its setup cell imports from (set by parser)
+    memo: dict | None      = field(default=None, init=False, repr=False, compare=False) # derived views
+
+    def __setattr__(
+        self,        # Module instance
+        name: str,   # field being assigned
+        value,       # new value
+    ):
+        "Assign a field and drop the memoized views."
+        object.__setattr__(self, name, value)
+        if name != 'memo': object.__setattr__(self, 'memo', None)
 
     @property
     def has_exports(self) -> bool:
@@ -123,16 +302,24 @@ class Module:
     @property
     def public_exports(
         self, # Module instance
-    ) -> list[Export]:  # exports visible in __init__.py
+    ) -> tuple[Export, ...]:  # exports visible in __init__.py
         "Exports that are part of the public API."
-        return [e for e in self.exports if e.public]
+        return _cached(self, 'public_exports', lambda: tuple(e for e in self.exports if e.public))
 
     @property
     def documented_exports(
         self, # Module instance
-    ) -> list[Export]:  # exports included in documentation
+    ) -> tuple[Export, ...]:  # exports included in documentation
         "Exports that should appear in docs."
-        return [e for e in self.exports if e.public]
+        return self.public_exports
+
+    @property
+    def renames(
+        self, # Module instance
+    ) -> dict[str, str]:  # original name → final name, only for renamed exports
+        "The renames this module's export source needs."
+        return _cached(self, 'renames', lambda: {e.name: e.final_name for e in self.exports
+                                                          if e.final_name != e.name})
 
 @dataclass
 class Meta:
@@ -143,6 +330,13 @@ class Meta:
     license: str = ''
     author: str = ''
     urls: dict = field(default_factory=dict)
+    requires_python: str = ''                           # e.g. '>=3.11'
+    dependencies: list = field(default_factory=list)    # PEP 508 requirement strings
+    extras: dict = field(default_factory=dict)          # optional-dependencies: extra → requirements
+    scripts: dict = field(default_factory=dict)         # console script name → 'module:function'
+    readme: str = ''                                    # readme file, relative to the project root
+    keywords: list = field(default_factory=list)
+    classifiers: list = field(default_factory=list)
 
     @property
     def repo_url(self) -> str:
@@ -161,17 +355,157 @@ class Project:
     config: Config
     init_extras: ParsedFile = field(default_factory=lambda: ParsedFile([], [], [], [])) 
     modules: list[Module] = field(default_factory=list)
+    memo: dict | None     = field(default=None, init=False, repr=False, compare=False) # derived views
+
+    def __setattr__(
+        self,        # Project instance
+        name: str,   # field being assigned
+        value,       # new value
+    ):
+        "Assign a field and drop the memoized views."
+        object.__setattr__(self, name, value)
+        if name != 'memo': object.__setattr__(self, 'memo', None)
+
+    def replace_module(
+        self,         # Project instance
+        mod: Module,  # new version of the module with the same name
+    ):
+        "Swap one module in place of its namesake; every view is rebuilt on next use."
+        self.modules = [mod if m.name == mod.name else m for m in self.modules]
 
     @property
     def mod_names(
         self, # Project instance
-    ) -> list[str]:  # list of module names
+    ) -> tuple[str, ...]:  # module names
         "All module names in build order."
-        return [m.name for m in self.modules]
+        return _cached(self, 'mod_names', lambda: tuple(m.name for m in self.modules))
 
     @property
     def nonempty_modules(
         self, # Project instance
-    ) -> list[Module]:  # modules that have exports
+    ) -> tuple[Module, ...]:  # modules that have exports
         "Modules that contain at least one export."
-        return [m for m in self.modules if m.has_exports]
+        return _cached(self, 'nonempty_modules', lambda: tuple(m for m in self.modules if m.has_exports))
+
+    @property
+    def by_name(
+        self, # Project instance
+    ) -> dict[str, Module]:  # module name → module
+        "Modules by name."
+        return _cached(self, 'by_name', lambda: {m.name: m for m in self.modules})
+
+    @property
+    def symbols(
+        self, # Project instance
+    ) -> dict[str, tuple[Module, Export]]:  # final name → (defining module, export); the first definition wins
+        "Symbol index over every export in the project."
+        def make():
+            out = {}
+            for m in self.modules:
+                for e in m.exports: out.setdefault(e.final_name, (m, e))
+            return out
+        return _cached(self, 'symbols', make)
+
+    @property
+    def renames(
+        self, # Project instance
+    ) -> dict[str, str]:  # original name → final name; names absent here are not renamed
+        "Every module's renames in one map, as the bundle applies them."
+        return _cached(self, 'renames', lambda: {k: v for m in self.modules for k, v in m.renames.items()})
+
+    @property
+    def graph(
+        self, # Project instance
+    ) -> dict[str, tuple]:  # module name → names of the modules it imports
+        "Module dependency graph from the setup-cell imports."
+        return {m.name: m.deps for m in self.modules}
+
+    def topo_modules(
+        self, # Project instance
+    ) -> list[Module]:  # every module after the modules it imports
+        """Modules in dependency order, otherwise in notebook order.
+
+        Raises graphlib.CycleError naming the notebooks when they import each
+        other in a cycle.
+        """
+        index = {m.name: i for i, m in enumerate(self.modules)}
+        ts = graphlib.TopologicalSorter(self.graph)
+        try: ts.prepare()
+        except graphlib.CycleError as e:
+            raise graphlib.CycleError(f"notebooks import each other in a cycle: {' → '.join(e.args[1])}",
+                                      e.args[1]) from None
+        ready, out = [], []
+        while ts.is_active():
+            for n in ts.get_ready(): heapq.heappush(ready, (index[n], n))
+            _, n = heapq.heappop(ready)
+            out.append(self.modules[index[n]])
+            ts.done(n)
+        return out
+
+    def dependents(
+        self,             # Project instance
+        names: set[str],  # changed module names
+    ) -> set[str]:        # those modules plus every module importing them, transitively
+        "Modules to recompute after the given ones changed."
+        users = {}
+        for m in self.modules:
+            for d in m.deps: users.setdefault(d, []).append(m.name)
+        out, todo = set(), list(names)
+        while todo:
+            n = todo.pop()
+            if n in out: continue
+            out.add(n)
+            todo += users.get(n, [])
+        return out
+
+    @property
+    def export_graph(
+        self, # Project instance
+    ) -> dict[str, tuple]:  # 'module.final_name' → the exports it references, in the same notation
+        """Export-level dependency graph, in notebook order.
+
+        Export.refs resolve to exports of the same module first, then of the
+        modules its setup cell imports. Like refs it over-approximates: a local
+        that shadows an export's name counts. Self references are left out.
+        """
+        def make():
+            own = {m.name: {e.name: f'{m.name}.{e.final_name}' for e in m.exports} for m in self.modules}
+            graph = {}
+            for m in self.modules:
+                scopes = [own[m.name], *(own[d] for d in m.deps if d in own)]
+                for e in m.exports:
+                    key = own[m.name][e.name]
+                    hits = (next((sc[r] for sc in scopes if r in sc), None) for r in e.refs)
+                    graph[key] = tuple(dict.fromkeys(t for t in hits if t and t != key))
+            return graph
+        return _cached(self, 'export_graph', make)
+
+    def topo_exports(
+        self, # Project instance
+    ) -> list[str]:  # every export after the exports it references, cycles kept together
+        "Exports in dependency order; members of a cycle (mutual recursion) stay in notebook order."
+        sccs = _cached(self, 'export_sccs', lambda: _sccs(self.export_graph))
+        return [k for comp in sccs for k in comp]
+
+    def export_cycles(
+        self, # Project instance
+    ) -> list[tuple[str, ...]]:  # groups of exports that reference each other, directly or not
+        "Export-level cycles: mutual recursion within or across notebooks."
+        sccs = _cached(self, 'export_sccs', lambda: _sccs(self.export_graph))
+        return [comp for comp in sccs if len(comp) > 1]
+
+    def export_dependents(
+        self,            # Project instance
+        keys: set[str],  # changed exports, as 'module.final_name'
+    ) -> set[str]:       # those exports plus every export referencing them, transitively
+        "Exports to recompute after the given ones changed."
+        users = {}
+        for k, refs in self.export_graph.items():
+            for r in refs: users.setdefault(r, []).append(k)
+        out, todo = set(), list(keys)
+        while todo:
+            k = todo.pop()
+            if k in out: continue
+            out.add(k)
+            todo += users.get(k, [])
+        return out
@@ -0,0 +1,155 @@
+from pathlib import Path
+import ctypes, ctypes.util, os, select, struct, sys, time
+from .types import Project
+from .parse import read_project, refresh_project
+from .build_pkg import build
+from .build_docs import build_docs
+from .build_docs_html import build_docs_html
+
+IN_EVENTS = 8 | 64 | 128 | 256 | 512
+IN_CLOEXEC = 524288
+
+def _inotify(
+    dirs: list[Path],            # directories to watch (non-recursive)
+) -> tuple[int, dict] | None:    # (fd, {watch descriptor: dir}) or None if unavailable
+    "Set up inotify watches through libc, or None off Linux / on failure."
+    if not sys.platform.startswith('linux'): return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0: return None
+    wds = {}
+    for d in dirs:
+        wd = libc.inotify_add_watch(fd, os.fsencode(d), IN_EVENTS)
+        if wd < 0:
+            os.close(fd)
+            return None
+        wds[wd] = d
+    return fd, wds
+
+def _read_inotify(
+    fd: int,        # inotify file descriptor
+    wds: dict,      # watch descriptor → directory
+) -> set[Path]:     # paths named by the pending events
+    "Drain one read() worth of inotify events into paths."
+    buf, out, i = os.read(fd, 64 * 1024), set(), 0
+    while i < len(buf):
+        wd, _, _, n = struct.unpack_from('iIII', buf, i)
+        name = buf[i + 16:i + 16 + n].rstrip(b'\0')
+        if name and wd in wds: out.add(wds[wd] / os.fsdecode(name))
+        i += 16 + n
+    return out
+
+def snapshot(
+    dirs: list[Path], # directories to stat (non-recursive)
+) -> dict:            # path → (mtime_ns, size)
+    "Stat every entry of the watched directories with one scandir each."
+    snap = {}
+    for d in dirs:
+        with os.scandir(d) as it:
+            for e in it:
+                if e.is_file():
+                    st = e.stat()
+                    snap[d / e.name] = (st.st_mtime_ns, st.st_size)
+    return snap
+
+def watch_changes(
+    dirs: list[Path],       # directories to watch (non-recursive)
+    debounce: float = 0.05, # quiet period that ends a batch, in seconds
+    interval: float = 0.25, # polling period when inotify is unavailable
+):                          # yields sets of changed paths, one per burst
+    "Yield debounced batches of changed paths, via inotify or stat polling."
+    if ino := _inotify(dirs):
+        fd, wds = ino
+        try:
+            while True:
+                select.select([fd], [], [])
+                changed = _read_inotify(fd, wds)
+                while select.select([fd], [], [], debounce)[0]:
+                    changed |= _read_inotify(fd, wds)
+                yield changed
+        finally:
+            os.close(fd)
+
+    prev = snapshot(dirs)
+    while True:
+        time.sleep(interval)
+        cur = snapshot(dirs)
+        if cur == prev: continue
+        while True:
+            time.sleep(debounce)
+            nxt = snapshot(dirs)
+            if nxt == cur: break
+            cur = nxt
+        changed = {p for p in cur.keys() | prev.keys() if cur.get(p) != prev.get(p)}
+        prev = cur
+        yield changed
+
+def refresh(
+    proj: Project,     # project currently held in memory
+    changed: set[Path],# paths reported changed
+    root: str = '.',   # project root
+    **overrides,       # Config overrides, as for read_project
+) -> tuple[Project, set[str] | None] | None: # (new project, modules to rerender or None for all), None if nothing relevant changed
+    """Bring a held Project up to date with a batch of changed paths.
+
+    pyproject.toml means a full read_project; notebook changes reparse just
+    those notebooks, and, if the module set is unchanged, only they and
+    their importers need rendering. Parse errors propagate.
+    """
+    nbs, pyproject = Path(root) / proj.config.nbs, Path(root) / 'pyproject.toml'
+    changed = {p for p in changed if p == pyproject or (p.parent == nbs and p.suffix == '.py')}
+    if not changed: return None
+    if pyproject in changed: return read_project(root, **overrides), None
+    new = refresh_project(proj, changed, root)
+    stems = {p.stem for p in changed}
+    only = (new.dependents({m.name for m in new.modules if m.nb_stem in stems})
+            if new.mod_names == proj.mod_names else None)
+    return new, only
+
+def _rebuild(
+    proj: Project,   # project currently held in memory
+    html: bool,      # also render index.html
+    only: set[str] | None = None, # modules whose package files need rendering, None for all
+):
+    "Run the build stages that follow a parse."
+    build(proj, only)
+    build_docs(proj)
+    if html: build_docs_html(proj)
+
+def watch(
+    root: str = '.',   # project root containing pyproject.toml and notebooks
+    html: bool = False, # also rebuild index.html on every change
+    **overrides,        # Config overrides, as for read_project
+):
+    """Build once, then rebuild on every notebook or pyproject.toml save until Ctrl-C.
+
+    The notebook directory is fixed at startup; restart after changing `nbs`.
+    """
+    proj = read_project(root, **overrides)
+    _rebuild(proj, html)
+
+    nbs, pyproject = Path(root) / proj.config.nbs, Path(root) / 'pyproject.toml'
+    print(f"Watching {nbs} and {pyproject} (Ctrl-C to stop)")
+    try:
+        for changed in watch_changes([nbs, Path(root)]):
+            t0 = time.perf_counter()
+            try:
+                if not (fresh := refresh(proj, changed, root, **overrides)): continue
+            except (ExceptionGroup, OSError, ValueError) as e:
+                errs = e.exceptions if isinstance(e, ExceptionGroup) else (e,)
+                print("Parse failed, keeping last good build:", *errs, sep='\n  ')
+                continue
+            new, only = fresh
+            names = ', '.join(sorted(p.name for p in changed
+                                     if p == pyproject or (p.parent == nbs and p.suffix == '.py')))
+            if new == proj:
+                print(f"No export changes ({names}) in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+                continue
+            proj = new
+            _rebuild(proj, html, only)
+            print(f"Rebuilt ({names}) in {(time.perf_counter() - t0) * 1e3:.1f} ms")
+    except KeyboardInterrupt:
+        print("Stopped watching")